@@ -1,2 +1,3 @@
 from .accounts import Account
-from .players import Player, ActivePlayer, SkillLevel
\ No newline at end of file
+from .players import Player, ActivePlayer, SkillLevel
+from .player_stats import PlayerStats
@@ -12,11 +12,19 @@ import modules.tools as tools
 from classes.players import Player, ActivePlayer
 import modules.database as db
 import modules.accounts_handler as accounts
+import modules.message_router as message_router
+import modules.match_results as match_results
+import modules.duel_tracker as duel_tracker
+import modules.deadlines as deadlines
+import modules.match_channels as match_channels
+import modules.match_state as match_state
+from modules.outbound import Priority
 
 log = getLogger('fs_bot')
 
 MATCH_TIMEOUT_TIME = 600
 MATCH_WARN_TIME = 300
+RANKED_MATCH_LENGTH = 7  # rounds, first to RANKED_MATCH_LENGTH // 2 + 1 wins
 _match_id_counter = 0
 
 
@@ -30,13 +38,14 @@ class MatchState(Enum):
 class BaseMatch:
     _active_matches = dict()
     _recent_matches = dict()
+    _matches_by_owner = dict()  # active matches by owner.id
 
-    def __init__(self, owner: Player, player: Player):
+    def __init__(self, owner: Player, player: Player, ranked: bool = False):
         global _match_id_counter
         _match_id_counter += 1
         self.__id = _match_id_counter
         self.owner = owner
-        self.__invited = list()
+        self.__invited: dict[Player, int] = dict()  # invited players: invite expiry stamp
         self.start_stamp = tools.timestamp_now()
         self.end_stamp = None
         self.timeout_stamp = None
@@ -48,7 +57,12 @@ class BaseMatch:
         self.text_channel: discord.TextChannel | None = None
         self.info_message: discord.Message | None = None
         self.embed_cache: discord.Embed | None = None
+        self.ranked = ranked
+        self.round_results: list[tuple[int, int]] = list()  # ranked round results, (timestamp, winner id)
+        self.__unconfirmed_rounds: list[int] = list()  # winner ids of tracked rounds the loser hasn't reported
+        self.__ranked_players: tuple[ActivePlayer, ...] = tuple(self.__players) if ranked else ()
         BaseMatch._active_matches[self.id] = self
+        BaseMatch._matches_by_owner[owner.id] = self
 
     @classmethod
     def active_matches_list(cls):
@@ -58,48 +72,133 @@ class BaseMatch:
     def active_matches_dict(cls):
         return BaseMatch._active_matches
 
+    @classmethod
+    def active_match_by_owner(cls, owner_id):
+        return BaseMatch._matches_by_owner.get(owner_id)
+
     @classmethod
     def active_match_channel_ids(cls):
         return {match.text_channel.id: match for match in BaseMatch._active_matches.values()}
 
     @classmethod
-    async def create(cls, owner: Player, invited: Player):
+    async def create(cls, owner: Player, invited: Player, ranked: bool = False):
         global _match_id_counter  # init _match_id_counter if first match created
         if not _match_id_counter:
             last_match = await db.async_db_call(db.get_last_element, 'matches')
             if last_match:
                 _match_id_counter = last_match['_id']
-        obj = cls(owner, invited)
-        obj.log(f'{owner.name} created the match with {invited.name}')
-
-        overwrites = {
-            d_obj.guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            d_obj.roles['app_admin']: discord.PermissionOverwrite(view_channel=True),
-            d_obj.roles['admin']: discord.PermissionOverwrite(view_channel=True),
-            d_obj.roles['mod']: discord.PermissionOverwrite(view_channel=True),
-            d_obj.roles['bot']: discord.PermissionOverwrite(view_channel=True, manage_channels=True,
-                                                            manage_permissions=True),
-            d_obj.guild.get_member(owner.id): discord.PermissionOverwrite(view_channel=True),
-            d_obj.guild.get_member(invited.id): discord.PermissionOverwrite(view_channel=True)
-        }
-
-        obj.text_channel = await d_obj.categories['user'].create_text_channel(
-            name=f'casual┊{obj.id_str}┊',
-            overwrites=overwrites,
-            topic=f"Match channel for Casual Match [{obj.id_str}], created by {obj.owner.name}")
+        obj = cls(owner, invited, ranked=ranked)
+        obj.log(f'{owner.name} created the {obj.kind.lower()} match with {invited.name}')
+        if obj.ranked:
+            duel_tracker.track_match(obj)
+        obj.update_timeout()
+
+        try:
+            obj.text_channel = await match_channels.acquire(
+                name=f'{obj.kind.lower()}┊{obj.id_str}┊',
+                topic=f"Match channel for {obj.kind} Match [{obj.id_str}], created by {obj.owner.name}",
+                members=[d_obj.guild.get_member(owner.id), d_obj.guild.get_member(invited.id)])
+        except Exception:
+            obj._abort()
+            raise
+        message_router.add_channel_route(obj.text_channel.id, obj.on_message)
         obj.embed_cache = embeds.match_info(obj)
 
-        obj.info_message = await disp.MATCH_INFO.send(obj.text_channel, match=obj,
-                                                      view=views.MatchInfoView(obj))
+        obj.info_message = await disp.MATCH_INFO.send(obj.text_channel, embed=obj.embed_cache,
+                                                      view=views.MatchInfoView(obj), priority=Priority.HIGH)
+        tools.background(obj._pin_info(), f'pinning Match ID [{obj.id}] info')  # pinning doesn't delay the match
+        match_state.mark(obj)
 
-        await obj.info_message.pin()
+        return obj
 
+    @classmethod
+    def from_data(cls, data: dict) -> 'BaseMatch | None':
+        """Rehydrate an active match from its live state, None if its channel or owner no longer exist"""
+        global _match_id_counter
+        owner = Player.get(data['owner'])
+        channel = d_obj.guild.get_channel(data['channel_id'])
+        ranked_players = [Player.get(p_id) for p_id in data['ranked_players']]
+        if not owner or not channel or data['owner'] not in data['current_players'] or None in ranked_players:
+            return None
+        obj = cls.__new__(cls)
+        obj.__id = data['_id']
+        _match_id_counter = max(_match_id_counter, obj.__id)
+        obj.owner = owner
+        obj.__invited = {Player.get(p_id): expiry for p_id, expiry in data['invited'] if Player.get(p_id)}
+        obj.start_stamp = data['start_stamp']
+        obj.end_stamp = None
+        obj.timeout_stamp = None
+        obj.__players = [p.on_playing(obj) for p in map(Player.get, data['current_players']) if p]
+        obj.__previous_players = [p for p in map(Player.get, data['previous_players']) if p]
+        obj.match_log = [tuple(entry) for entry in data['match_log']]
+        obj.status = MatchState[data['status']]
+        obj.text_channel = channel
+        obj.info_message = channel.get_partial_message(data['info_message_id']) if data['info_message_id'] else None
+        obj.embed_cache = None  # forces the info message to be edited, re-attaching its view
+        obj.round_results = [tuple(result) for result in data['round_results']]
+        obj.__unconfirmed_rounds = list()
+        obj.ranked = bool(data['ranked_players'])
+        obj.__ranked_players = tuple(p.active if p.active and p.match is obj else ActivePlayer(p)
+                                     for p in ranked_players)
+        for a_player in obj.__ranked_players:
+            a_player.round_wins = sum(1 for _, winner in obj.round_results if winner == a_player.id)
+            a_player.round_losses = len(obj.round_results) - a_player.round_wins
+
+        BaseMatch._active_matches[obj.id] = obj
+        BaseMatch._matches_by_owner[owner.id] = obj
+        message_router.add_channel_route(channel.id, obj.on_message)
+        if obj.ranked:
+            duel_tracker.track_match(obj)
+        if data['timeout_stamp']:
+            obj._schedule_timeout(data['timeout_stamp'])
+        obj.log('Match restored after restart')
         return obj
 
+    @classmethod
+    async def restore_active(cls) -> list['BaseMatch']:
+        """Restore the matches that were active when the bot stopped.  Matches that can't be restored are closed"""
+        global _match_id_counter
+        last_match, live = await asyncio.gather(db.async_db_call(db.get_last_element, 'matches'),
+                                                db.async_db_call(match_state.load_live))
+        if last_match:
+            _match_id_counter = max(_match_id_counter, last_match['_id'])
+        restored, closed = [], []
+        for data in live:
+            try:
+                match = cls.from_data(data)
+            except (KeyError, ValueError, TypeError) as e:
+                log.warning(f'Match ID [{data["_id"]}]: invalid live state: {e}')
+                match = None
+            if match:
+                restored.append(match)
+            else:
+                closed.append(data['_id'])
+        if closed:
+            await db.async_db_call(db.bulk_update_elements, 'matches',
+                                   [(m_id, {'$set': {'end_stamp': tools.timestamp_now()}}) for m_id in closed])
+        log.info(f'Restored {len(restored)} active matches, closed {len(closed)} that could not be restored')
+        return restored
+
+    def _abort(self):
+        """Undo a match whose channel could not be created, freeing its players"""
+        self._cancel_timeout()
+        duel_tracker.untrack_match(self)
+        match_state.discard(self)
+        for a_player in self.__players:
+            a_player.on_quit()
+        BaseMatch._active_matches.pop(self.id, None)
+        if BaseMatch._matches_by_owner.get(self.owner.id) is self:
+            del BaseMatch._matches_by_owner[self.owner.id]
+
+    async def _pin_info(self):
+        try:
+            await self.info_message.pin()
+        except discord.HTTPException as e:
+            log.warning(f'Match ID [{self.id}]: could not pin info message: {e}')
+
     async def join_match(self, player: Player):
         #  Joins player to match and updates permissions
-        if player in self.__invited:
-            self.__invited.remove(player)
+        self.__invited.pop(player, None)
         self.__players.append(player.on_playing(self))
         await self.channel_update(player, True)
         await disp.MATCH_JOIN.send(self.text_channel, player.mention)
@@ -123,19 +222,45 @@ class BaseMatch:
             await self.update_match()
 
     async def end_match(self):
+        if self.end_stamp:  # already ending
+            return
         self.end_stamp = tools.timestamp_now()
         self.status = MatchState.ENDED
         self.log('Match Ended')
-        await disp.MATCH_END.send(self.text_channel, self.id)
-        await self.update_match(check_timeout=False)
-        await db.async_db_call(db.set_element, 'matches', self.id, self.get_data())
-        with self.text_channel.typing():
-            await asyncio.sleep(10)
-        for player in self.__players:
-            await self.leave_match(player)
-        await self.text_channel.delete(reason='Match Ended')
-        del BaseMatch._active_matches[self.id]
-        BaseMatch._recent_matches[self.id] = self
+        match_state.discard(self)
+        self._cancel_timeout()
+        duel_tracker.untrack_match(self)
+        if self.ranked_result:
+            match_results.submit(self.id, *self.__ranked_players, RANKED_MATCH_LENGTH)
+        await asyncio.gather(disp.MATCH_END.send(self.text_channel, self.id),
+                             self.update_match(check_timeout=False),
+                             self._write_final())
+        tools.background(self._teardown(), f'tearing down Match ID [{self.id}]')
+
+    async def _write_final(self):
+        """Replace the live state with the ended match, after any live state write already in flight"""
+        async with match_state.write_lock:
+            await db.async_db_call(db.set_element, 'matches', self.id, self.get_data())
+
+    async def _teardown(self):
+        """Removes players and releases the channel, in the background so ending a match returns immediately"""
+        try:
+            async with self.text_channel.typing():
+                await asyncio.sleep(10)
+            results = await asyncio.gather(*[self.leave_match(player) for player in list(self.__players)],
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    log.warning(f'Match ID [{self.id}]: error removing player during teardown: {result}')
+            message_router.remove_channel_route(self.text_channel.id)
+            await match_channels.release(self.text_channel)
+        except Exception as e:
+            log.exception(f'Match ID [{self.id}]: error during teardown', exc_info=e)
+        finally:
+            BaseMatch._active_matches.pop(self.id, None)
+            if BaseMatch._matches_by_owner.get(self.owner.id) is self:
+                del BaseMatch._matches_by_owner[self.owner.id]
+            BaseMatch._recent_matches[self.id] = self
 
     def get_data(self):
         data = {'_id': self.id, 'start_stamp': self.start_stamp, 'end_stamp': self.end_stamp,
@@ -143,8 +268,69 @@ class BaseMatch:
                 'current_players': [p.id for p in self.__players],
                 'previous_players': [p.id for p in self.__previous_players],
                 'match_log': self.match_log}
+        if self.ranked_result:
+            data['ranked'] = self.ranked_result
         return data
 
+    def get_state(self):
+        """Live state of an active match, written by modules.match_state and restored by from_data"""
+        return {'_id': self.id, 'start_stamp': self.start_stamp, 'end_stamp': None, 'owner': self.owner.id,
+                'status': self.status.name, 'channel_id': 0 if not self.text_channel else self.text_channel.id,
+                'info_message_id': 0 if not self.info_message else self.info_message.id,
+                'current_players': [p.id for p in self.__players],
+                'previous_players': [p.id for p in self.__previous_players],
+                'invited': [[p.id, expiry] for p, expiry in self.__invited.items()],
+                'timeout_stamp': self.timeout_stamp,
+                'ranked_players': [p.id for p in self.__ranked_players],
+                'round_results': self.round_results,
+                'match_log': self.match_log[-match_state.LOG_TAIL:]}
+
+    @property
+    def ranked_result(self):
+        """Result stored with ranked matches, None if not ranked or no rounds were played"""
+        if not self.ranked or not self.round_results:
+            return None
+        return {'players': [p.id for p in self.__ranked_players],
+                'round_wins': [p.round_wins for p in self.__ranked_players],
+                'match_length': RANKED_MATCH_LENGTH}
+
+    async def report_round(self, winner_id: int, manual: bool = False) -> bool:
+        """Record a ranked round won by winner_id, ending the match once a player has won enough rounds.
+        Rounds are reported by both the duel tracker and players.  While the tracker covers both players, a manual
+        report only confirms a round the tracker recorded, otherwise a round won by the same player within
+        duel_tracker.DEBOUNCE of the last is the same round reported twice.
+        Returns False if the round could not be recorded"""
+        if not self.ranked or self.end_stamp or winner_id not in [p.id for p in self.__ranked_players]:
+            return False
+        if manual and duel_tracker.covers(self):
+            if winner_id not in self.__unconfirmed_rounds:
+                return False
+            self.__unconfirmed_rounds.remove(winner_id)
+            self.log(f'Round won by {self.__ranked_player_name(winner_id)} confirmed by the loser')
+            return True
+        now = tools.timestamp_now()
+        if self.round_results and self.round_results[-1][1] == winner_id \
+                and now - self.round_results[-1][0] < duel_tracker.DEBOUNCE:
+            return False
+        self.round_results.append((now, winner_id))
+        if not manual:
+            self.__unconfirmed_rounds.append(winner_id)
+        for p in self.__ranked_players:
+            if p.id == winner_id:
+                p.round_wins += 1
+            else:
+                p.round_losses += 1
+        winner = next(p for p in self.__ranked_players if p.id == winner_id)
+        self.log(f'{winner.name} won round {len(self.round_results)}, score: {self.score_str}')
+        if winner.round_wins >= RANKED_MATCH_LENGTH // 2 + 1:
+            await self.end_match()
+        else:
+            await self.update_match()
+        return True
+
+    def __ranked_player_name(self, p_id):
+        return next(p.name for p in self.__ranked_players if p.id == p_id)
+
     async def channel_update(self, player, action: bool):
         player_member = d_obj.guild.get_member(player.id)
         await self.text_channel.set_permissions(player_member, view_channel=action)
@@ -154,33 +340,59 @@ class BaseMatch:
             new_embed = embeds.match_info(self)
             if not tools.compare_embeds(new_embed, self.embed_cache):
                 self.embed_cache = new_embed
-                await disp.MATCH_INFO.edit(self.info_message, embed=new_embed, view=views.MatchInfoView(self))
+                await disp.MATCH_INFO.edit(self.info_message, embed=new_embed, view=views.MatchInfoView(self),
+                                           priority=Priority.LOW)
         else:
             self.info_message = await disp.MATCH_INFO.send(self.text_channel, match=self, view=views.MatchInfoView(self))
             await self.info_message.pin()
 
     def update_status(self):
+        status = self.status
         if len(self.players) < 2:
             self.status = MatchState.INVITING
         elif len(self.online_players) < 2:
             self.status = MatchState.GETTING_READY
         elif self.online_players:
             self.status = MatchState.PLAYING
+        if self.status != status:
+            match_state.mark(self)
+
+    def update_timeout(self):
+        """Schedule the warn / timeout deadlines while no players are online, cancel them once a player is online.
+        New matches get MATCH_WARN_TIME of grace before the countdown starts"""
+        if self.online_players or self.end_stamp:
+            self._cancel_timeout()
+        elif not self.timeout_stamp:
+            self._schedule_timeout(max(tools.timestamp_now(), self.start_stamp + MATCH_WARN_TIME))
+
+    def reset_timeout(self):
+        """Restart the timeout countdown from now, if counting down"""
+        if self.timeout_stamp:
+            self._schedule_timeout(tools.timestamp_now())
+
+    def _schedule_timeout(self, stamp):
+        self.timeout_stamp = stamp
+        match_state.mark(self)
+        deadlines.schedule(('match_warn', self.id), stamp + MATCH_WARN_TIME, self._on_timeout_warn)
+        deadlines.schedule(('match_timeout', self.id), stamp + MATCH_TIMEOUT_TIME, self._on_timeout)
+
+    def _cancel_timeout(self):
+        if self.timeout_stamp:
+            match_state.mark(self)
+        self.timeout_stamp = None
+        deadlines.cancel(('match_warn', self.id))
+        deadlines.cancel(('match_timeout', self.id))
 
-    async def update_timeout(self):
-        # check timeout, reset if new match or online_players
-        if self.online_players or self.start_stamp < tools.timestamp_now() - MATCH_WARN_TIME:
-            self.timeout_stamp = None
-        else:
-            if not self.timeout_stamp:  # set timeout stamp
-                self.timeout_stamp = tools.timestamp_now()
-            elif self.should_timeout:  # Timeout Match
-                self.log("Match timed out for inactivity...")
-                await disp.MATCH_TIMEOUT.send(self.text_channel, self.all_mentions)
-                await self.end_match()
-            elif self.should_warn:  # Warn of timeout
-                self.log("Match will timeout in " + tools.format_time_from_stamp(self.timeout_at, 'R'))
-                await disp.MATCH_TIMEOUT_WARN.send(self.text_channel, self.all_mentions, delete_after=30)
+    async def _on_timeout_warn(self):
+        self.log("Match will timeout in " + tools.format_time_from_stamp(self.timeout_at, 'R'))
+        await disp.MATCH_TIMEOUT_WARN.send(self.text_channel, self.all_mentions, delete_after=30)
+        self.embed_cache = None  # force the edit, as the view's Reset Timeout button is only enabled once warned
+        await self.update_embed()
+
+    async def _on_timeout(self):
+        self.log("Match timed out for inactivity...")
+        await disp.MATCH_TIMEOUT.send(self.text_channel, self.all_mentions)
+        await self.end_match()
 
     async def update_match(self, check_timeout=True, login=None):
         """Update the match object.  Check_timeout is used to specify whether the timeout should be checked, default True.
@@ -188,18 +400,44 @@ class BaseMatch:
         Otherwise, updates timeout, match status, and the embed if required"""
 
         if check_timeout:
-            await self.update_timeout()
+            self.update_timeout()
 
         if login:
             self.log(f"{login.name} logged in as {login.online_name}")
+            if self.ranked:
+                duel_tracker.track_match(self)
 
         self.update_status()
         await self.update_embed()
 
+    async def on_message(self, message: discord.Message):
+        """Routed messages sent in the match channel"""
+        self.log(f'{message.author.name}: {message.content}', public=False)
+        await self.update_match(check_timeout=False)
+
+    def state_signature(self) -> tuple:
+        """Everything update_match acts on, if unchanged since the last update, updating again would do nothing"""
+        return (self.status, self.end_stamp, self.timeout_stamp,
+                tuple(p.id for p in self.__players), tuple(p.id for p in self.__invited),
+                tuple(p.online_name for p in self.__players), tuple(self.round_results[-1:]), len(self.match_log))
+
     def log(self, message, public=True):
         self.match_log.append((tools.timestamp_now(), message, public))
+        match_state.mark(self)
         log.info(f'Match ID [{self.id}]: {message}')
 
+    @property
+    def kind(self):
+        return 'Ranked' if self.ranked else 'Casual'
+
+    @property
+    def ranked_players(self):
+        return self.__ranked_players
+
+    @property
+    def score_str(self):
+        return ' - '.join([f'{p.name} {p.round_wins}' for p in self.__ranked_players])
+
     @property
     def recent_logs(self):
         return self.match_log[-10:]
@@ -228,7 +466,7 @@ class BaseMatch:
 
     @property
     def invited(self):
-        return self.__invited
+        return self.__invited.keys()
 
     @property
     def online_players(self):
@@ -248,7 +486,7 @@ class BaseMatch:
     def should_warn(self):
         if not self.timeout_stamp:
             return False
-        return True if self.timeout_stamp < tools.timestamp_now() - MATCH_WARN_TIME else False
+        return True if self.timeout_stamp <= tools.timestamp_now() - MATCH_WARN_TIME else False
 
     @property
     def should_timeout(self):
@@ -256,11 +494,17 @@ class BaseMatch:
             return False
         return True if self.timeout_stamp < tools.timestamp_now() - MATCH_TIMEOUT_TIME else False
 
-    def invite(self, player: Player):
+    def invite(self, player: Player, expiry: int = 0):
         if player not in self.__invited:
-            self.__invited.append(player)
+            self.__invited[player] = expiry
+            match_state.mark(self)
 
     def decline_invite(self, player: Player):
-        if player in self.__invited:
-            self.__invited.remove(player)
+        if self.__invited.pop(player, None) is not None:
+            match_state.mark(self)
+
+    def clear_expired_invites(self, now):
+        for player in [p for p, expiry in self.__invited.items() if expiry and expiry < now]:
+            del self.__invited[player]
+            match_state.mark(self)
 
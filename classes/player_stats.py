@@ -5,39 +5,98 @@ from logging import getLogger
 
 # Internal Imports
 import modules.database as db
+import modules.tools as tools
 
 log = getLogger('fs_bot')
 
 
 class PlayerStats:
+    _all_stats = dict()  # in memory ratings table, by player_id
+    _dirty = set()  # player_id's with changes not yet persisted
+
+    @classmethod
+    def get(cls, p_id, p_name=None):
+        """Get a players stats from the ratings table, creating default stats if the player has none"""
+        stats = cls._all_stats.get(p_id)
+        if not stats:
+            stats = cls(p_id, p_name)
+        return stats
+
+    @classmethod
+    def get_all_stats(cls):
+        return cls._all_stats
+
+    @classmethod
+    def new_from_data(cls, data):  # make stats object from database data
+        return cls(data['_id'], None, data=data)
 
     @classmethod
     async def get_from_db(cls, p_id, p_name):
-        data = await db.async_db_call(db.get_element, 'player_stats', p_id)
+        if p_id in cls._all_stats:
+            return cls._all_stats[p_id]
+        data = await db.async_db_call(db.get_element, 'user_stats', p_id)
         return cls(p_id, p_name, data=data)
 
+    @classmethod
+    def take_dirty(cls) -> tuple[list[dict], list[tuple[int, int, list]]]:
+        """Data of every stats object changed since the last call, and their new history entries as
+        (player_id, index of first entry, entries), for a batched write"""
+        data, history = [], []
+        for p_id in cls._dirty:
+            stats = cls._all_stats.get(p_id)
+            if not stats:
+                continue
+            if stats.__pending_history:
+                history.append((p_id, stats.__history_count - len(stats.__pending_history),
+                                stats.__pending_history))
+                stats.__pending_history = list()
+            data.append(stats.get_data())
+        cls._dirty.clear()
+        return data, history
+
+    @classmethod
+    def clear_dirty(cls):
+        """Drop unwritten changes and history entries, when the whole table is about to be replaced"""
+        for p_id in cls._dirty:
+            stats = cls._all_stats.get(p_id)
+            if stats:
+                stats.__pending_history = list()
+        cls._dirty.clear()
+
+    @classmethod
+    def mark_dirty(cls, data: list[dict], history: list[tuple[int, int, list]]):
+        """Re-queue stats and history entries whose write failed, so they are retried next flush"""
+        for p_id, _, entries in history:
+            stats = cls._all_stats[p_id]
+            stats.__pending_history[:0] = entries
+        cls._dirty.update(d['_id'] for d in data)
+
     def __init__(self, p_id, p_name, data=None):
         self.__id = p_id
         self.__name = p_name
+        self.__pending_history = list()  # history entries not yet written, (match_id, centi-elo delta, stamp)
         if data:
-            self.__match_ids = data['matches']
-            self.__elo_history = data['elo_history']
+            self.__history_count = data.get('history_count', 0)  # entries in the elo_history collection
             self.__elo = data['elo']
             self.__match_wins = data['match_wins']
             self.__match_losses = data['match_losses']
+            if 'elo_history' in data:  # legacy embedded history, migrated to elo_history on next write
+                for match_id, elo_delta in data['elo_history'].items():
+                    self.__pending_history.append((int(match_id), round(elo_delta * 100), 0))
+                self.__history_count += len(self.__pending_history)
+                PlayerStats._dirty.add(p_id)
 
         else:
-            self.__match_ids = list()
-            self.__elo_history = dict()  # Dict of elo changes, by match_id: eloDelta
+            self.__history_count = 0
             self.__elo = 1000
             self.__match_wins = 0
             self.__match_losses = 0
+        PlayerStats._all_stats[p_id] = self
 
     def get_data(self):
         data = dict()
         data['_id'] = self.__id
-        data['matches'] = self.__match_ids
-        data['elo_history'] = self.__elo_history
+        data['history_count'] = self.__history_count
         data['elo'] = self.__elo
         data['match_wins'] = self.__match_wins
         data['match_losses'] = self.__match_losses
@@ -45,7 +104,7 @@ class PlayerStats:
 
     async def push_to_db(self):
         data = self.get_data()
-        await db.async_db_call(db.set_element, 'player_stats', {self.__id: data})
+        await db.async_db_call(db.set_element, 'user_stats', self.__id, data)
 
     @property
     def id(self):
@@ -56,12 +115,12 @@ class PlayerStats:
         return self.__name
 
     @property
-    def matches(self):
-        return self.__match_ids
+    def history_count(self):
+        return self.__history_count
 
     @property
-    def elo_history(self):
-        return self.__elo_history
+    def pending_history(self):
+        return self.__pending_history
 
     @property
     def match_wins(self):
@@ -75,17 +134,13 @@ class PlayerStats:
     def elo(self):
         return self.__elo
 
-    def add_match(self, match_id, new_elo, match_won):
-        self.__match_ids.append(match_id)
+    def add_match(self, match_id, new_elo, match_won, stamp=None):
         elo_delta = new_elo - self.__elo
-        self.__elo_history[match_id] = elo_delta
+        self.__pending_history.append((match_id, round(elo_delta * 100), stamp or tools.timestamp_now()))
+        self.__history_count += 1
+        self.__elo = new_elo
         if match_won:
             self.__match_wins += 1
-        else:
+        elif match_won is False:
             self.__match_losses += 1
-
-
-
-
-
-
+        PlayerStats._dirty.add(self.__id)
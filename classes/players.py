@@ -93,6 +93,7 @@ class Player:
     def name_check_add(cls, p):
         for i in range(3):
             cls._name_checking[i][p.ig_ids[i]] = p
+        census.track_chars(p.ig_ids)
 
     @classmethod
     def name_check_remove(cls, p):
@@ -101,6 +102,7 @@ class Player:
                 del cls._name_checking[i][p.ig_ids[i]]
             except KeyError:
                 log.warning(f"name_check_remove KeyError for player [id={p.id}], [key={p.ig_ids[i]}]")
+        census.untrack_chars(p.ig_ids)
 
     @classmethod
     def get_all_players(cls):
@@ -134,9 +136,10 @@ class Player:
         self.__first_lobbied_timestamp = 0
         self.__active = None
         self.__match = None
-        self.skill_level: SkillLevel = SkillLevel.BEGINNER
-        self.pref_factions: list[str] = []
-        self.req_skill_levels = None
+        self.__render_cache: dict[str, str] = dict()  # rendered embed lines, cleared when displayed fields change
+        self.__skill_level: SkillLevel = SkillLevel.BEGINNER
+        self.__pref_factions: list[str] = []
+        self.__req_skill_levels: list[SkillLevel] | None = None
         Player._all_players[p_id] = self  # adding to all players dictionary
 
     @classmethod
@@ -206,11 +209,43 @@ class Player:
                 await db.async_db_call(db.set_field, 'users', self.id, {'hidden': self.__hidden})
             case _:
                 raise KeyError(f"No field {arg} found")
+        self.__render_cache.clear()
 
     @property
     def name(self):
         return self.__name
 
+    @property
+    def render_cache(self):
+        return self.__render_cache
+
+    @property
+    def skill_level(self):
+        return self.__skill_level
+
+    @skill_level.setter
+    def skill_level(self, level: SkillLevel):
+        self.__skill_level = level
+        self.__render_cache.clear()
+
+    @property
+    def pref_factions(self):
+        return self.__pref_factions
+
+    @pref_factions.setter
+    def pref_factions(self, factions: list[str]):
+        self.__pref_factions = factions
+        self.__render_cache.clear()
+
+    @property
+    def req_skill_levels(self):
+        return self.__req_skill_levels
+
+    @req_skill_levels.setter
+    def req_skill_levels(self, levels: list[SkillLevel] | None):
+        self.__req_skill_levels = levels
+        self.__render_cache.clear()
+
     @property
     def id(self):
         return self.__id
@@ -304,6 +339,7 @@ class Player:
     def on_lobby_add(self):
         self.__lobbied_timestamp = tools.timestamp_now()
         self.__first_lobbied_timestamp = tools.timestamp_now()
+        self.__render_cache.clear()
 
     def reset_lobby_timestamp(self):
         self.__lobbied_timestamp = tools.timestamp_now()
@@ -311,6 +347,7 @@ class Player:
     def on_lobby_leave(self):
         self.__lobbied_timestamp = 0
         self.__first_lobbied_timestamp = 0
+        self.__render_cache.clear()
 
     def set_account(self, account: Account | None):
         self.__account = account
@@ -14,6 +14,9 @@ import modules.discord_obj as d_obj
 import modules.census as census
 import modules.loader as loader
 import modules.tools as tools
+import modules.elo_recompute as elo_recompute
+import modules.match_channels as match_channels
+import modules.outbound as outbound
 from classes import Player, ActivePlayer
 from classes.match import BaseMatch
 from display import AllStrings as disp, views, embeds
@@ -76,6 +79,13 @@ class AdminCog(commands.Cog):
         await d_obj.d_log(f"{action}ed {channel.mention}'s content filter")
         await ctx.respond(f"{action}ed {channel.mention}'s content filter", ephemeral=True)
 
+    @admin.command(name="outbound")
+    async def outbound_stats(self, ctx: discord.ApplicationContext):
+        """Outbound message queue length and queue latency per priority."""
+        lines = [f'{name}: {samples} samples, average {average:.2f}s, max {maximum:.2f}s'
+                 for name, (samples, average, maximum) in outbound.latency_stats().items()]
+        await disp.OUTBOUND_STATS.send_priv(ctx, outbound.queued(), '\n'.join(lines))
+
     @admin.command(name="rulesinit", )
     async def rulesinit(self, ctx: discord.ApplicationContext,
                         message_id: discord.Option(str, "Existing FSBot Rules message", required=False)):
@@ -165,6 +175,45 @@ class AdminCog(commands.Cog):
         await match.end_match()
         await disp.MATCH_END.send_priv(ctx, match.id_str)
 
+    @match_admin.command(name="loopstats")
+    async def loop_stats(self, ctx: discord.ApplicationContext):
+        """Duration and updated / skipped / failed matches of recent match update ticks."""
+        cog = self.bot.cogs.get('MatchesCog')
+        ticks = cog.tick_stats if cog else ()
+        if not ticks:
+            await disp.MATCH_LOOP_NO_STATS.send_priv(ctx)
+            return
+        n = len(ticks)
+        await disp.MATCH_LOOP_STATS.send_priv(ctx, n, sum(t[0] for t in ticks) / n, max(t[0] for t in ticks),
+                                              sum(t[1] for t in ticks) / n, sum(t[2] for t in ticks) / n,
+                                              sum(t[3] for t in ticks) / n)
+
+    @match_admin.command(name="poolstats")
+    async def pool_stats(self, ctx: discord.ApplicationContext):
+        """Match channel pool size and channel hand out latency percentiles."""
+        stats = match_channels.latency_percentiles()
+        if not stats:
+            await disp.MATCH_POOL_NO_STATS.send_priv(ctx, match_channels.pooled())
+            return
+        await disp.MATCH_POOL_STATS.send_priv(ctx, match_channels.pooled(), stats['p50'], stats['p90'], stats['p99'],
+                                              stats['max'], stats['pool_hit'])
+
+    #########################################################
+
+    elo_admin = admin.create_subgroup(
+        name="elo", description="Admin Elo Commands"
+    )
+
+    @elo_admin.command(name="recompute")
+    @commands.max_concurrency(number=1, wait=False)
+    async def elo_recompute(self, ctx: discord.ApplicationContext):
+        """Recompute every players rating from ranked match history, after changing Elo parameters."""
+        await ctx.defer(ephemeral=True)
+        await disp.ELO_RECOMPUTE_START.send_priv(ctx)
+        matches, players, elapsed = await elo_recompute.recompute()
+        await disp.ELO_RECOMPUTE_DONE.send_priv(ctx, matches, players, elapsed)
+        await d_obj.d_log(f"{ctx.user.mention} recomputed all ratings from {matches} ranked matches")
+
     #########################################################
 
     accounts = admin.create_subgroup(
@@ -263,6 +312,7 @@ class AdminCog(commands.Cog):
     async def account_sheet_reload(self):
         log.info("Reinitialized Account Sheet and Account Characters")
         await accounts.init(cfg.GAPI_SERVICE)
+        census.sync_accounts()
 
     @tasks.loop(seconds=10)
     async def account_watchtower(self):
@@ -8,34 +8,43 @@ Simple filter setup to create threads in #contentplug, and enforce the content o
 from discord.ext import commands
 import discord
 from logging import getLogger
+import re
 
 # Internal Imports
 import modules.config as cfg
 import modules.discord_obj as d_obj
+import modules.message_router as message_router
 
-TEST_LIST = ['.com', '.ru', '.net', '.org', '.info', '.biz', '.io', '.co', "https://", "http://", "www.", ".ca"]
 log = getLogger("fs_bot")
 
+
+def compile_link_regex(links: list[str]) -> re.Pattern:
+    """Single alternation regex matching any of the link substrings"""
+    return re.compile('|'.join(re.escape(link) for link in links))
+
+
 class ContentPlug(commands.Cog, name="ContentPlug"):
     def __init__(self, bot):
         self.bot = bot
         self.enabled = True
+        self.link_regex = compile_link_regex(cfg.content_plug_links)
+        message_router.add_channel_route(cfg.channels['content-plug'], self.on_message)
+
+    def cog_unload(self):
+        message_router.remove_channel_route(cfg.channels['content-plug'])
+
+    def has_link(self, content: str) -> bool:
+        return self.link_regex.search(content) is not None
 
-    @commands.Cog.listener()
     async def on_message(self, message):
+        """Routed messages sent in #content-plug"""
         if not self.enabled:
             return
-        matches = [item for item in TEST_LIST if (item in message.content)]
-
-        if message.author == self.bot.user:
-            return
-        elif not message.channel.id == cfg.channels['content-plug']:
-            return
         elif d_obj.roles['app_admin'] in message.author.roles:
             return
-        elif matches or message.attachments:
+        elif message.attachments or self.has_link(message.content):
             await message.create_thread(name=f"{message.author.display_name}'s content thread")
-        elif not matches:
+        else:
             log.info(f'{message.author.name} had a message deleted in content plug.')
             await message.delete()
             await message.channel.send(f'Oops {message.author.mention}, messages in this channel '
@@ -45,17 +54,15 @@ class ContentPlug(commands.Cog, name="ContentPlug"):
     async def on_message_edit(self, before, after):
         if not self.enabled:
             return
-        matches = [item for item in TEST_LIST if (item in after.content)]
-
-        if after.author == self.bot.user:
+        elif after.channel.id != cfg.channels['content-plug']:
             return
-        elif not after.channel.id == cfg.channels['content-plug']:
+        elif after.author == self.bot.user:
             return
         elif d_obj.roles['app_admin'] in after.author.roles:
             return
-        elif matches or before.attachments or after.attachments:
+        elif before.attachments or after.attachments or self.has_link(after.content):
             return
-        elif not matches:
+        else:
             log.info(f'{after.author.name} had a message deleted in content plug.')
             await after.delete()
             await after.channel.send(f'Oops {after.author.mention}, messages in this channel '
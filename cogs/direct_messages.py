@@ -4,22 +4,89 @@
 import os
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from logging import getLogger
 
 # Internal Imports
 import modules.config as cfg
 import modules.discord_obj as d_obj
 import modules.database as db
+import modules.message_router as message_router
+import modules.attachments as attachments
 from display import AllStrings as disp, views
 
 log = getLogger('fs_bot')
 
 DM_THREADS = {}  # dict of threads by user_id: thread_id
+DM_USERS = {}  # inverse of DM_THREADS, dict of users by thread_id: user_id
+# Forward user attachments to threads as links, rather than downloading and re-uploading.
+# Discord CDN links are signed and expire, so staff lose forwarded content after a while
+FORWARD_BY_URL = False
+
+# DM thread changes not yet written to restart_data, as 'dm_threads.<user_id>' fields
+_pending_set: dict[str, int] = dict()
+_pending_unset: set[str] = set()
 
 
 def dm_threads_by_thread():
-    return {v: k for k, v in DM_THREADS.items()}
+    return DM_USERS
+
+
+def _add_dm_thread(user_id, thread_id):
+    DM_THREADS[user_id] = thread_id
+    DM_USERS[thread_id] = user_id
+    field = f'dm_threads.{user_id}'
+    _pending_unset.discard(field)
+    _pending_set[field] = thread_id
+
+
+def _remove_dm_thread(user_id):
+    thread_id = DM_THREADS.pop(user_id)
+    DM_USERS.pop(thread_id, None)
+    field = f'dm_threads.{user_id}'
+    _pending_set.pop(field, None)
+    _pending_unset.add(field)
+
+
+def _take_pending() -> tuple[dict, dict]:
+    set_doc = dict(_pending_set)
+    unset_doc = dict.fromkeys(_pending_unset, '')
+    _pending_set.clear()
+    _pending_unset.clear()
+    return set_doc, unset_doc
+
+
+def _requeue_pending(set_doc: dict, unset_doc: dict):
+    """Re-queue changes whose write failed, unless the same entry has changed since"""
+    for field, thread_id in set_doc.items():
+        if field not in _pending_set and field not in _pending_unset:
+            _pending_set[field] = thread_id
+    for field in unset_doc:
+        if field not in _pending_set:
+            _pending_unset.add(field)
+
+
+def _write_pending(set_doc: dict, unset_doc: dict):
+    """Write changes in a single upsert, creating restart_data if it doesn't exist yet"""
+    update = {}
+    if set_doc:
+        update['$set'] = set_doc
+    if unset_doc:
+        update['$unset'] = unset_doc
+    if update:
+        db.bulk_update_elements('restart_data', [(0, update)])
+
+
+async def flush_dm_threads():
+    """Write pending DM thread changes to restart_data as per entry $set / $unset, re-queued if the write fails"""
+    set_doc, unset_doc = _take_pending()
+    if not set_doc and not unset_doc:
+        return
+    try:
+        await db.async_db_call(_write_pending, set_doc, unset_doc)
+    except Exception as e:
+        _requeue_pending(set_doc, unset_doc)
+        log.exception('Error writing DM threads, will retry', exc_info=e)
 
 
 def dm_threads_to_str():
@@ -44,8 +111,8 @@ async def _stop_dm_thread(user_id, user_side):
         if user_side:
             await disp.DM_THREAD_CLOSE.edit(msg, view=False)
     finally:
-        del DM_THREADS[user_id]
-        await db.async_db_call(db.set_field, 'restart_data', 0, {'dm_threads': DM_THREADS})
+        message_router.remove_channel_route(DM_THREADS[user_id])
+        _remove_dm_thread(user_id)
         await disp.DM_THREAD_CLOSE.send(user)
 
 class DMCog(commands.Cog):
@@ -53,6 +120,20 @@ class DMCog(commands.Cog):
     def __init__(self, client):
         self.bot = client
         self.bot.add_view(self.ThreadStopView())
+        message_router.add_dm_handler(self.dm_listener)
+        self.dm_threads_persist_loop.start()
+
+    def cog_unload(self):
+        message_router.remove_dm_handler(self.dm_listener)
+        for thread_id in DM_THREADS.values():
+            message_router.remove_channel_route(thread_id)
+        self.dm_threads_persist_loop.cancel()
+        _write_pending(*_take_pending())
+
+    @tasks.loop(seconds=5)
+    async def dm_threads_persist_loop(self):
+        """Batches DM thread changes into one restart_data update"""
+        await flush_dm_threads()
 
     @commands.slash_command(name="modmail")
     async def modmail(self, ctx: discord.ApplicationContext,
@@ -71,31 +152,23 @@ class DMCog(commands.Cog):
             user = ctx.user
             await disp.DM_RECEIVED_GUILD.send_temp(ctx, init_msg)
         await disp.DM_RECEIVED.send(user, init_msg)
-        DM_THREADS[ctx.author.id] = thread.id
-        await db.async_db_call(db.set_element, 'restart_data', 0, {'dm_threads': dm_threads_to_str()})
-
-    @commands.Cog.listener(name='on_message')
-    async def dm_listener(self, message: discord.Message):
-        if message.author == self.bot.user:
-            return
+        _add_dm_thread(ctx.author.id, thread.id)
+        message_router.add_channel_route(thread.id, self.thread_listener)
 
-        # If Mod response in a thread
-        if isinstance(message.channel, discord.Thread) and message.channel.id in DM_THREADS.values():
-            if not message.content.startswith(('~ ', '! ')):
-                return
-            files = []
-            for file in message.attachments:
-                files.append(await file.to_file())
-            user = d_obj.bot.get_user(dm_threads_by_thread()[message.channel.id])
-            await message.add_reaction('📨')
-            await disp.DM_TO_USER.send(user, msg=message, files=files)
+    async def thread_listener(self, message: discord.Message):
+        """Routed messages sent in modmail threads, relays Mod responses to the user"""
+        if not message.content.startswith(('~ ', '! ')):
             return
+        files = await attachments.fetch_files(message.attachments)
+        user = d_obj.bot.get_user(DM_USERS[message.channel.id])
+        await message.add_reaction('📨')
+        await disp.DM_TO_USER.send(user, msg=message, files=files)
 
+    async def dm_listener(self, message: discord.Message):
+        """Routed direct messages"""
         # alternate to /modmail
         if not message.guild and message.content.lower().startswith(('modmail ', 'dm ', 'staff ')):
-            files = []
-            for file in message.attachments:
-                files.append(await file.to_file())
+            files = await attachments.fetch_files(message.attachments)
             msg = message.clean_content
             i = msg.index(' ')
             msg = msg[i + 1:]
@@ -111,12 +184,15 @@ class DMCog(commands.Cog):
 
         # if player response in dm
         if not message.guild and message.author.id in DM_THREADS:
+            content = message.clean_content
             files = []
-            for file in message.attachments:
-                files.append(await file.to_file())
+            if FORWARD_BY_URL and message.attachments:
+                content = f'{content}\n{attachments.links(message.attachments)}'
+            else:
+                files = await attachments.fetch_files(message.attachments)
             thread = d_obj.bot.get_channel(DM_THREADS[message.author.id])
             await message.add_reaction('📨')
-            await disp.DM_IN_THREAD.send(thread, message.author.mention, message.clean_content, allowed_mentions=False,
+            await disp.DM_IN_THREAD.send(thread, message.author.mention, content, allowed_mentions=False,
                                          files=files)
 
     class ThreadStopView(views.FSBotView):
@@ -127,7 +203,7 @@ class DMCog(commands.Cog):
         @discord.ui.button(label="Stop thread", custom_id="stop_thread", style=discord.ButtonStyle.red)
         async def stop_thread_button(self, button: discord.Button, inter: discord.Interaction):
             try:
-                user_id = dm_threads_by_thread()[inter.message.id]
+                user_id = DM_USERS[inter.message.id]
             except KeyError:
                 pass
             else:
@@ -137,7 +213,8 @@ class DMCog(commands.Cog):
 
 
 def setup(client):
-    client.add_cog(DMCog(client))
+    cog = DMCog(client)
+    client.add_cog(cog)
 
     #  init DM_THREADS from db
     data = db.get_field('restart_data', 0, 'dm_threads')
@@ -145,4 +222,7 @@ def setup(client):
         log.info("No DM threads data found in database")
         return
     DM_THREADS.update(int_dict_from_str(data))
+    DM_USERS.update({v: k for k, v in DM_THREADS.items()})
+    for thread_id in DM_THREADS.values():
+        message_router.add_channel_route(thread_id, cog.thread_listener)
     log.info(f'{len(DM_THREADS)} DM thread{"s" if len(DM_THREADS) > 1 else ""} found in database')
@@ -17,8 +17,11 @@ from classes.players import Player
 from classes.match import BaseMatch
 from display import AllStrings as disp, embeds, views
 import modules.lobby as lobby
+import modules.matchmaking as matchmaking
+import modules.ranked_queue as ranked_queue
 
 import modules.tools as tools
+from modules.outbound import Priority
 
 log = getLogger('fs_bot')
 
@@ -50,20 +53,18 @@ class ChallengeDropdown(discord.ui.Select):
             await disp.LOBBY_INVITED_ALREADY.send_priv(inter, ' '.join([p.mention for p in already_invited]))
             [invited_players.remove(p) for p in already_invited]
             inter = inter.followup
-        no_dms = list()
+
         match = None
-        for invited in invited_players:
-            for _ in range(3):
-                try:
-                    memb = d_obj.guild.get_member(invited.id)
-                    view = views.InviteView(owner, invited)
-                    msg = await disp.DM_INVITED.send(memb, invited.mention, owner.mention, view=view)
-                    view.msg = msg
-                    match = lobby.invite(owner, invited)
-                    break
-                except discord.Forbidden:
-                    if invited not in no_dms:
-                        no_dms.append(invited)
+
+        async def send_invite(invited: Player):
+            nonlocal match
+            memb = d_obj.guild.get_member(invited.id)
+            view = views.InviteView(owner, invited)
+            view.msg = await disp.DM_INVITED.send(memb, invited.mention, owner.mention, view=view)
+            # register as soon as this DM is sent, so the invite can be accepted before other DMs finish
+            match = lobby.invite(owner, invited)
+
+        _, no_dms = await d_obj.send_dms(invited_players, send_invite)
         if no_dms:
             await disp.LOBBY_NO_DM.send_temp(inter.channel, ','.join([p.mention for p in no_dms]))
             lobby.lobby_log(
@@ -123,6 +124,17 @@ class DashboardView(views.FSBotView):
             return
         await disp.LOBBY_LONGER_HISTORY.send(inter, inter.user.mention, logs=lobby.logs_longer(), delete_after=20)
 
+    @discord.ui.button(label="Find Opponents", custom_id='dashboard-compatible', style=discord.ButtonStyle.blurple)
+    async def compatible_lobby_button(self, button: discord.Button, inter: discord.Interaction):
+        player: Player = Player.get(inter.user.id)
+        if not await d_obj.is_registered(inter, player):
+            return
+        compatible = matchmaking.compatible(player)
+        if compatible:
+            await disp.LOBBY_COMPATIBLE.send_priv(inter, player.mention, ' '.join([p.mention for p in compatible]))
+        else:
+            await disp.LOBBY_NO_COMPATIBLE.send_priv(inter, player.mention)
+
     @discord.ui.button(label="Leave Lobby", custom_id='dashboard-leave', style=discord.ButtonStyle.red)
     async def leave_lobby_button(self, button: discord.Button, inter: discord.Interaction):
         player: Player = Player.get(inter.user.id)
@@ -134,6 +146,30 @@ class DashboardView(views.FSBotView):
         else:
             await disp.LOBBY_NOT_IN.send_temp(inter, player.mention)
 
+    @discord.ui.button(label="Join Ranked Queue", custom_id='dashboard-ranked-join', style=discord.ButtonStyle.green)
+    async def join_ranked_button(self, button: discord.Button, inter: discord.Interaction):
+        player: Player = Player.get(inter.user.id)
+        if not await d_obj.is_registered(inter, player):
+            return
+        elif player.match:
+            await disp.LOBBY_ALREADY_MATCH.send_priv(inter, player.mention, player.match.text_channel.mention)
+        elif await ranked_queue.join(player):
+            await disp.RANKED_JOIN.send_temp(inter, player.mention)
+            await _cog.update_dashboard()
+        else:
+            await disp.RANKED_ALREADY_IN.send_priv(inter, player.mention)
+
+    @discord.ui.button(label="Leave Ranked Queue", custom_id='dashboard-ranked-leave', style=discord.ButtonStyle.red)
+    async def leave_ranked_button(self, button: discord.Button, inter: discord.Interaction):
+        player: Player = Player.get(inter.user.id)
+        if not await d_obj.is_registered(inter, player):
+            return
+        elif ranked_queue.leave(player):
+            await disp.RANKED_LEAVE.send_temp(inter, player.mention)
+            await _cog.update_dashboard()
+        else:
+            await disp.RANKED_NOT_IN.send_temp(inter, player.mention)
+
 
 class DuelLobbyCog(commands.Cog, name="DuelLobbyCog", command_attrs=dict(guild_ids=[cfg.general['guild_id']],
                                                                          default_permission=True)):
@@ -146,7 +182,7 @@ class DuelLobbyCog(commands.Cog, name="DuelLobbyCog", command_attrs=dict(guild_i
         self.dashboard_embed = None
 
         self.dashboard_loop.start()
-
+        self.ranked_queue_loop.start()
 
     def cog_check(self, ctx):
         player = Player.get(ctx.user.id)
@@ -167,7 +203,8 @@ class DuelLobbyCog(commands.Cog, name="DuelLobbyCog", command_attrs=dict(guild_i
             except KeyError:
                 log.info('No previous Duel Dashboard found, creating new message...')
                 self.dashboard_embed = embeds.duel_dashboard(
-                    lobby.lobbied(), lobby.logs_recent(), BaseMatch.active_matches_list()
+                    lobby.lobbied(), lobby.logs_recent(), BaseMatch.active_matches_list(),
+                    len(ranked_queue.queued()), ranked_queue.stats(), matchmaking.propose_pairings()
                 )
                 self.dashboard_msg = await self.dashboard_channel.send(content="",
                                                                        embed=self.dashboard_embed,
@@ -188,15 +225,18 @@ class DuelLobbyCog(commands.Cog, name="DuelLobbyCog", command_attrs=dict(guild_i
                                                 check=self.dashboard_purge_check)
 
         #  Post new embed only if embed has changed
-        new_embed = embeds.duel_dashboard(lobby.lobbied(), lobby.logs_recent(), BaseMatch.active_matches_list())
+        new_embed = embeds.duel_dashboard(lobby.lobbied(), lobby.logs_recent(), BaseMatch.active_matches_list(),
+                                          len(ranked_queue.queued()), ranked_queue.stats(),
+                                          matchmaking.propose_pairings())
         if not tools.compare_embeds(new_embed, self.dashboard_embed):
             self.dashboard_embed = new_embed
-            await self.dashboard_msg.edit(embed=new_embed,
-                                          view=DashboardView())
+            await disp.LOBBY_DASHBOARD.edit(self.dashboard_msg, embed=new_embed, view=DashboardView(),
+                                            priority=Priority.LOW)
 
     @tasks.loop(seconds=10)
     async def dashboard_loop(self):
         """Loop to check lobby timeouts, also updates dashboard in-case preference changes are made"""
+        lobby.clear_expired_invites()
         for p in lobby.lobbied():
             stamp_dt = dt.fromtimestamp(p.lobbied_timestamp)
             if stamp_dt < (dt.now() - timedelta(minutes=lobby.timeout_minutes)):
@@ -210,6 +250,30 @@ class DuelLobbyCog(commands.Cog, name="DuelLobbyCog", command_attrs=dict(guild_i
 
         await self.update_dashboard()
 
+    @tasks.loop(seconds=5)
+    async def ranked_queue_loop(self):
+        """Processes the ranked queue in batches, creating a match for each pairing"""
+        pairs = ranked_queue.tick()
+        for p1, p2 in pairs:
+            if p1.match or p2.match:  # joined a match since queueing, requeue the other player
+                for p in (p1, p2):
+                    if not p.match:
+                        ranked_queue.requeue(p)
+                continue
+            try:
+                match = await BaseMatch.create(p1, p2, ranked=True)
+            except Exception as e:
+                log.exception(f'Error creating ranked match for {p1.name} and {p2.name}, requeueing', exc_info=e)
+                ranked_queue.requeue(p1)
+                ranked_queue.requeue(p2)
+                continue
+            await disp.MATCH_JOIN.send_temp(match.text_channel, f'{p1.mention}{p2.mention}')
+            lobby.lobby_leave(p1, match)
+            lobby.lobby_leave(p2, match)
+            lobby.lobby_log(f'{p1.name} and {p2.name} were paired by the ranked queue in Match: {match.id_str}')
+        if pairs:
+            await self.update_dashboard()
+
 
 _cog: DuelLobbyCog = None
 
@@ -0,0 +1,82 @@
+"""Leaderboard cog, paginated rankings of rated players"""
+
+# External Imports
+import discord
+from discord.ext import commands
+from logging import getLogger
+
+# Internal Imports
+import modules.config as cfg
+import modules.leaderboard as leaderboard
+from classes import Player
+from classes.player_stats import PlayerStats
+from display import AllStrings as disp, embeds, views
+
+log = getLogger('fs_bot')
+
+_page_cache: dict[int, tuple[tuple, discord.Embed]] = dict()  # page: (page ranks and total, embed)
+
+
+def page_embed(page: int) -> discord.Embed:
+    """Leaderboard page embed, rebuilt only when a rank on the page has changed"""
+    ranks = leaderboard.top(leaderboard.PAGE_SIZE, page * leaderboard.PAGE_SIZE)
+    key = (tuple(ranks), leaderboard.total())
+    cached = _page_cache.get(page)
+    if cached and cached[0] == key:
+        return cached[1]
+    entries = []
+    for rank, p_id, elo in ranks:
+        stats = PlayerStats.get(p_id)
+        entries.append((rank, Player.get(p_id), elo, stats.match_wins, stats.match_losses))
+    embed = embeds.leaderboard(entries, page, leaderboard.pages(), leaderboard.total())
+    _page_cache[page] = (key, embed)
+    return embed
+
+
+class LeaderboardView(views.FSBotView):
+    def __init__(self, page: int):
+        super().__init__(timeout=180)
+        self.page = page
+        self.previous_button.disabled = page <= 0
+        self.next_button.disabled = page >= leaderboard.pages() - 1
+
+    async def _show(self, inter: discord.Interaction, page: int):
+        view = LeaderboardView(page)
+        await disp.LEADERBOARD.edit(inter, embed=page_embed(view.page), view=view)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.blurple)
+    async def previous_button(self, button: discord.Button, inter: discord.Interaction):
+        await self._show(inter, max(0, self.page - 1))
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.blurple)
+    async def next_button(self, button: discord.Button, inter: discord.Interaction):
+        await self._show(inter, min(leaderboard.pages() - 1, self.page + 1))
+
+
+class LeaderboardCog(commands.Cog, name="LeaderboardCog",
+                     command_attrs=dict(guild_ids=[cfg.general['guild_id']], default_permission=True)):
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.slash_command(name="leaderboard")
+    async def leaderboard(self, ctx: discord.ApplicationContext,
+                          page: discord.Option(int, "Leaderboard page to show", min_value=1, required=False)):
+        """Show the ranked leaderboard"""
+        page = min((page or 1) - 1, leaderboard.pages() - 1)
+        await disp.LEADERBOARD.send_priv(ctx, embed=page_embed(page), view=LeaderboardView(page))
+
+    @commands.slash_command(name="rank")
+    async def rank(self, ctx: discord.ApplicationContext):
+        """Show your rank on the leaderboard"""
+        rank = leaderboard.rank_of(ctx.user.id)
+        if rank is None:
+            await disp.LEADERBOARD_UNRANKED.send_priv(ctx, ctx.user.mention)
+            return
+        await disp.LEADERBOARD_RANK.send_priv(ctx, ctx.user.mention, rank, leaderboard.total(),
+                                              round(PlayerStats.get(ctx.user.id).elo),
+                                              leaderboard.percentile(ctx.user.id))
+
+
+def setup(client):
+    client.add_cog(LeaderboardCog(client))
@@ -1,7 +1,10 @@
 """Cog designed to handle events for Matches, passing them on, holds views for matches, and matches themselves are tied to here"""
 
 # External Imports
-import discord
+import asyncio
+import time
+from collections import deque
+from logging import getLogger
 
 from discord.ext import commands, tasks
 
@@ -12,9 +15,18 @@ import modules.config as cfg
 import modules.tools as tools
 from classes.match import BaseMatch, MatchState
 from classes import Player
-from modules import discord_obj as d_obj
 from modules.spam_detector import is_spam
 import modules.accounts_handler as accounts
+import modules.stats_handler as stats_handler
+import modules.duel_tracker as duel_tracker
+import modules.match_channels as match_channels
+import modules.match_state as match_state
+import modules.database as db
+from classes.player_stats import PlayerStats
+
+log = getLogger('fs_bot')
+
+MAX_CONCURRENT_UPDATES = 10  # match updates in flight at once during a matches_loop tick
 
 
 class MatchesCog(commands.Cog, name="MatchesCog",
@@ -22,43 +34,92 @@ class MatchesCog(commands.Cog, name="MatchesCog",
 
     def __init__(self, bot):
         self.bot = bot
+        self.match_signatures: dict[int, tuple] = dict()  # match_id: state signature after its last update
+        # Recent matches_loop ticks, (duration, updated, skipped as unchanged, failed)
+        self.tick_stats: deque[tuple[float, int, int, int]] = deque(maxlen=100)
         self.matches_init.start()
         self.matches_loop.start()
+        self.stats_flush_loop.start()
+
+    def cog_unload(self):
+        self.stats_flush_loop.cancel()
+        self.channel_pool_loop.cancel()
+        self.match_state_loop.cancel()
+        stats_handler.write_stats(*PlayerStats.take_dirty())
+        db.bulk_update_elements('matches', match_state.take_dirty())
 
     @tasks.loop(count=1)
     async def matches_init(self):
-        # clear old match channels if any exist
-        channels = d_obj.categories['user'].text_channels
-        for channel in channels:
-            if channel.name.startswith('casual'):
-                await channel.delete()
+        duel_tracker.start()
+        # restore matches active before a restart, then adopt any other old match channels into the channel pool
+        restored = await BaseMatch.restore_active()
+        await match_channels.reconcile(exclude=set(BaseMatch.active_match_channel_ids()))
+        self.channel_pool_loop.start()
+        self.match_state_loop.start()
+        # refresh restored info messages, re-attaching their views
+        results = await asyncio.gather(*[match.update_match() for match in restored], return_exceptions=True)
+        for match, result in zip(restored, results):
+            if isinstance(result, Exception):
+                log.warning(f'Match ID [{match.id}]: could not refresh restored match: {result}')
 
-    @tasks.loop(seconds=30)
-    async def matches_loop(self):
-        # update match info embeds
-        try:
-            for match in BaseMatch.active_matches_list():
-                # only iterate on matches that have started > 5 seconds ago, and are not stopped
-                if match.start_stamp > tools.timestamp_now() - 5 or match.end_stamp:
-                    continue
+    @tasks.loop(seconds=60)
+    async def channel_pool_loop(self):
+        """Keeps the match channel pool at its configured size"""
+        await match_channels.maintain()
+        stats = match_channels.latency_percentiles()
+        if stats:
+            log.debug(f'Match channel latency p50: {stats["p50"]:.2f}s, p90: {stats["p90"]:.2f}s, '
+                      f'p99: {stats["p99"]:.2f}s, pool hits: {stats["pool_hit"]:.0%}')
+
+    async def _update_match(self, match: BaseMatch, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
                 await match.update_match()
-        except:  # TODO this is far too broad.
-            pass
+            except Exception as e:
+                log.exception(f'Error updating Match ID [{match.id}] in matches_loop', exc_info=e)
+                self.match_signatures.pop(match.id, None)
+                return False
+            self.match_signatures[match.id] = match.state_signature()
+            return True
 
-    @commands.Cog.listener('on_message')
-    async def matches_message_listener(self, message: discord.Message):
+    @tasks.loop(seconds=30)
+    async def matches_loop(self):
+        """Update match info embeds concurrently, skipping matches whose state hasn't changed since their last
+        update.  A failing match is logged, and doesn't affect the others"""
+        start = time.perf_counter()
+        now = tools.timestamp_now()
+        to_update = []
+        unchanged = 0
+        for match in list(BaseMatch.active_matches_list()):
+            # only iterate on matches that have started > 5 seconds ago, and are not stopped
+            if match.start_stamp > now - 5 or match.end_stamp:
+                continue
+            if self.match_signatures.get(match.id) == match.state_signature():
+                unchanged += 1
+                continue
+            to_update.append(match)
+        active = BaseMatch.active_matches_dict()
+        for match_id in [m_id for m_id in self.match_signatures if m_id not in active]:
+            del self.match_signatures[match_id]
 
-        if message.author == self.bot.user:
-            return
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPDATES)
+        results = await asyncio.gather(*[self._update_match(match, semaphore) for match in to_update])
+        failed = results.count(False)
+        duration = time.perf_counter() - start
+        self.tick_stats.append((duration, len(results) - failed, unchanged, failed))
+        if failed:
+            log.warning(f'matches_loop tick: {failed} of {len(results)} match updates failed')
+        log.debug(f'matches_loop tick: updated {len(results) - failed} matches in {duration:.2f}s')
 
-        match_channel_dict = BaseMatch.active_match_channel_ids()
-        if message.channel.id not in match_channel_dict:
-            return
+    @tasks.loop(seconds=5)
+    async def match_state_loop(self):
+        """Batches active match state changes into one bulk write"""
+        await match_state.flush()
 
-        match_channel_dict[message.channel.id].log(
-            f'{message.author.name}: {message.content}', public=False
-        )
-        await match_channel_dict[message.channel.id].update_match()
+    @tasks.loop(seconds=30)
+    async def stats_flush_loop(self):
+        """Batches rating changes into one bulk write"""
+        await stats_handler.flush_stats()
 
 
 def setup(client):
@@ -13,6 +13,7 @@ from classes.players import Player, SkillLevel
 import modules.database as db
 from display import AllStrings as disp, views, embeds
 import modules.discord_obj as d_obj
+import modules.matchmaking as matchmaking
 
 
 
@@ -83,6 +84,7 @@ class SkillLevelDropdown(discord.ui.Select):
     async def callback(self, inter: discord.Interaction):
         p: classes.Player = classes.Player.get(inter.user.id)
         p.skill_level = SkillLevel[self.values[0]]
+        matchmaking.update(p)
         await p.db_update('skill_level')
         await disp.SKILL_LEVEL.send_priv(inter, str(p.skill_level))
 
@@ -106,12 +108,14 @@ class RequestedSkillLevelDropdown(discord.ui.Select):
         p: classes.Player = classes.Player.get(inter.user.id)
         if 'Any' in self.values or len(self.values) >= len(list(SkillLevel)):
             p.req_skill_levels = []
+            matchmaking.update(p)
             await p.db_update('req_skill_levels')
             await disp.SKILL_LEVEL_REQ_ONE.send_priv(inter, 'No Preference')
             return
 
         p.req_skill_levels = [SkillLevel[value] for value in self.values]
         p.req_skill_levels.sort(key=SkillLevel.sort)
+        matchmaking.update(p)
         skill_level_str = ' '.join([f'[{level.rank}:{str(level)}]' for level in p.req_skill_levels])
         await p.db_update('req_skill_levels')
 
@@ -143,6 +147,7 @@ class PreferredFactionDropdown(discord.ui.Select):
         p: classes.Player = classes.Player.get(interaction.user.id)
         p.pref_factions.clear()
         p.pref_factions = self.values
+        matchmaking.update(p)
         await p.db_update('pref_factions')
         factions_str = ''
         for fac in self.values:
@@ -13,6 +13,20 @@ from modules.tools import format_time_from_stamp as format_stamp
 from classes.players import SkillLevel, Player
 import modules.discord_obj as d_obj
 
+SUGGESTED_PAIRINGS = 5  # proposed pairings listed on the duel dashboard
+
+# Cache of static embeds and static embed fields by name, as name: (config version, value).
+# Entries built from an older config version are rebuilt, so reloading the config invalidates the cache.
+# Cached embeds are shared, and must not be modified by callers.
+_cache: dict[str, tuple[int, object]] = dict()
+
+
+def _cached(name, builder):
+    entry = _cache.get(name)
+    if entry is None or entry[0] != cfg.config_version:
+        entry = _cache[name] = (cfg.config_version, builder())
+    return entry[1]
+
 
 def fs_author(embed) -> Embed:
     """
@@ -173,7 +187,45 @@ def register_info(player) -> Embed:
     return fs_author(embed)
 
 
-def duel_dashboard(lobbied_players: list['Player'], logs: list[(int, str)], matches: list) -> Embed:
+def _dashboard_header_fields() -> list[dict]:
+    """Static fields of the duel dashboard, the skill level legend and lobby header"""
+    skill_level_shorthands = [f'**{level.rank}**: {str(level)}' for level in list(SkillLevel)]
+    string = ''
+    for i in skill_level_shorthands:
+        string += f'[{i}] '
+    return [
+        dict(name='Skill Level Ranks', value=string, inline=False),
+        dict(name='----------------------Unranked Lobby----------------------',
+             value='@Mention [Preferred Faction(s)][Skill Level][Wanted Level(s)][Time]\n',
+             inline=False)
+    ]
+
+
+def _dashboard_line(p: 'Player') -> str:
+    preferred_facs = ''.join([cfg.emojis[fac] for fac in p.pref_factions]) if p.pref_factions else 'Any'
+    req_skill_levels = ' '.join([str(level.rank) for level in p.req_skill_levels]) \
+        if p.req_skill_levels else 'Any'
+    f_lobbied_stamp = format_stamp(p.first_lobbied_timestamp)
+    return f'{p.mention}({p.name}) [{preferred_facs}][{p.skill_level.rank}][{req_skill_levels}][{f_lobbied_stamp}]\n '
+
+
+def _match_line(p: 'Player') -> str:
+    preferred_facs = ''.join([cfg.emojis[fac] for fac in p.pref_factions]) if p.pref_factions else 'Any'
+    return f'{p.mention}({p.name}) [{preferred_facs}][{p.skill_level.rank}]\n'
+
+
+def _player_line(p: 'Player', kind: str, builder) -> str:
+    """Rendered line for a player, cached on the player until one of its displayed fields changes"""
+    try:
+        return p.render_cache[kind]
+    except KeyError:
+        line = p.render_cache[kind] = builder(p)
+        return line
+
+
+def duel_dashboard(lobbied_players: list['Player'], logs: list[(int, str)], matches: list,
+                   ranked_queued: int = 0, ranked_stats: tuple[float, float] = (0, 0),
+                   pairings: list[tuple['Player', 'Player']] = None) -> Embed:
     """Player visible duel dashboard, shows currently looking duelers, their requested skill Levels."""
     colour = Colour.blurple() if lobbied_players else Colour.greyple()
 
@@ -184,37 +236,31 @@ def duel_dashboard(lobbied_players: list['Player'], logs: list[(int, str)], matc
         timestamp=dt.now()
     )
 
-    # Dashboard Description
-    skill_level_shorthands = [f'**{level.rank}**: {str(level)}' for level in list(SkillLevel)]
-    string = ''
-    for i in skill_level_shorthands:
-        string += f'[{i}] '
-    embed.add_field(
-        name='Skill Level Ranks',
-        value=string,
-        inline=False
-    )
-
-    # Player_list Header
-    embed.add_field(
-        name='----------------------Unranked Lobby----------------------',
-        value='@Mention [Preferred Faction(s)][Skill Level][Wanted Level(s)][Time]\n',
-        inline=False
-    )
+    # Dashboard Description and Player_list Header, static
+    for field in _cached('dashboard_header', _dashboard_header_fields):
+        embed.add_field(**field)
     if lobbied_players:
-        players_string = ''
-        for p in lobbied_players:
-            preferred_facs = ''.join([cfg.emojis[fac] for fac in p.pref_factions]) if p.pref_factions else 'Any'
-            req_skill_levels = ' '.join([str(level.rank) for level in p.req_skill_levels]) \
-                if p.req_skill_levels else 'Any'
-            f_lobbied_stamp = format_stamp(p.first_lobbied_timestamp)
-            string = f'{p.mention}({p.name}) [{preferred_facs}][{p.skill_level.rank}][{req_skill_levels}][{f_lobbied_stamp}]\n '
-            players_string += string
+        players_string = ''.join([_player_line(p, 'dashboard', _dashboard_line) for p in lobbied_players])
 
         embed.add_field(name="----------------------------------------------------------------",
                         value=players_string,
                         inline=False)
 
+    embed.add_field(
+        name='----------------------Ranked Queue----------------------',
+        value=f'Players queued: **{ranked_queued}**\n'
+              f'Recent pairings: average wait **{ranked_stats[0]:.0f}s**, average Elo gap **{ranked_stats[1]:.0f}**',
+        inline=False
+    )
+
+    if pairings:
+        pairings_str = ''.join([f'{p1.mention} vs {p2.mention}\n' for p1, p2 in pairings[:SUGGESTED_PAIRINGS]])
+        embed.add_field(
+            name='Suggested Duels',
+            value=pairings_str,
+            inline=False
+        )
+
     if matches:
         matches_str = ''
         for match in matches:
@@ -291,6 +337,9 @@ def match_info(match) -> Embed:
                       f"Match Start Time: {format_stamp(match.start_stamp)}\n"
                       )
 
+    if match.ranked:
+        match_info_str += f"Score: {match.score_str}\n"
+
     if match.timeout_at:
         match_info_str += f"Match will timeout in {format_stamp(match.timeout_at, 'R')}"
 
@@ -307,11 +356,7 @@ def match_info(match) -> Embed:
         inline=False
     )
     if match.invited:
-        invited_string = ''
-        for p in match.invited:
-            preferred_facs = ''.join([cfg.emojis[fac] for fac in p.pref_factions]) if p.pref_factions else 'Any'
-            string = f'{p.mention}({p.name}) [{preferred_facs}][{p.skill_level.rank}]\n'
-            invited_string += string
+        invited_string = ''.join([_player_line(p, 'match', _match_line) for p in match.invited])
 
         embed.add_field(name="Invited Players",
                         value=invited_string,
@@ -319,13 +364,7 @@ def match_info(match) -> Embed:
                         )
 
     if match.players:
-        players_string = ''
-        for p in match.players:
-            p = p.player
-            preferred_facs = ''.join([cfg.emojis[fac] for fac in p.pref_factions]) if p.pref_factions else 'Any'
-            string = f'{p.mention}({p.name}) [{preferred_facs}][{p.skill_level.rank}]\n'
-
-            players_string += string
+        players_string = ''.join([_player_line(p.player, 'match', _match_line) for p in match.players])
 
         embed.add_field(name="Players",
                         value=players_string,
@@ -354,6 +393,27 @@ def match_info(match) -> Embed:
     return fs_author(embed)
 
 
+def leaderboard(entries: list[tuple[int, 'Player', float, int, int]], page: int, pages: int, total: int) -> Embed:
+    """Leaderboard page, entries as (rank, player, elo, wins, losses)"""
+    embed = Embed(
+        colour=Colour.gold(),
+        title="Flight School Bot Leaderboard",
+        description=f"Page {page + 1}/{pages}, {total} rated players",
+        timestamp=dt.now()
+    )
+
+    string = 'No rated players yet!'
+    if entries:
+        string = ''
+        for rank, p, elo, wins, losses in entries:
+            name = p.mention if p else 'Unknown Player'
+            string += f'**#{rank}** {name} [{round(elo)}] [{wins}W / {losses}L]\n'
+    embed.add_field(name='Rank [Elo] [Record]',
+                    value=string,
+                    inline=False)
+    return fs_author(embed)
+
+
 def to_staff_dm_embed(author: 'discord.User', msg: str) -> Embed:
     author_disc = author.name + "#" + author.discriminator
     embed = Embed(
@@ -400,6 +460,10 @@ def from_staff_dm_embed(msg: 'discord.Message') -> Embed:
 
 
 def fsbot_rules_embed() -> Embed:
+    return _cached('rules', _fsbot_rules_embed)
+
+
+def _fsbot_rules_embed() -> Embed:
     embed = Embed(
         colour=Colour.blurple(),
         title="Flight School Bot Rules",
@@ -461,6 +525,10 @@ def fsbot_rules_embed() -> Embed:
 
 
 def fsbot_info_embed() -> Embed:
+    return _cached('info', _fsbot_info_embed)
+
+
+def _fsbot_info_embed() -> Embed:
     embed = Embed(
         colour=Colour.blurple(),
         title="Info and Usage",
@@ -11,10 +11,77 @@ from logging import getLogger
 import modules.config as cfg
 from .embeds import *
 from modules.tools import UnexpectedError
+import modules.outbound as outbound
+from modules.outbound import Priority
 
 log = getLogger('fs_bot')
 
 
+# Send / Edit handlers by context type, as handler(ctx, action, args_dict)
+
+async def _channel_handler(ctx, action, args_dict):
+    return await getattr(ctx, action)(**args_dict)
+
+
+async def _message_handler(ctx, action, args_dict):
+    if action == "send":
+        return await ctx.reply(**args_dict)
+    if action == "edit":
+        return await ctx.edit(**args_dict)
+
+
+async def _interaction_response_handler(ctx, action, args_dict):
+    return await getattr(ctx, action + '_message')(**args_dict)
+
+
+async def _webhook_handler(ctx, action, args_dict):
+    if ctx.type != discord.WebhookType.application:
+        raise UnexpectedError(f"Unrecognized Context, {type(ctx)}")
+    if action == "send":
+        return await ctx.send(**args_dict)
+    if action == "edit":  # Probably (definitely) doesn't work
+        return await getattr(await ctx.fetch_message(), 'edit_message')(**args_dict)
+
+
+async def _interaction_handler(ctx, action, args_dict):
+    if ctx.response.is_done() and action == 'send':
+        return await ctx.followup.send(**args_dict)
+    return await getattr(ctx.response, action + '_message')(**args_dict)
+
+
+async def _application_context_handler(ctx, action, args_dict):
+    if action == "send":
+        return await ctx.respond(**args_dict)
+    if action == "edit":
+        return await ctx.edit(**args_dict)
+
+
+# Outbound scheduler routes by context type, contexts not listed here (interactions) are sent directly
+_ROUTES = {
+    discord.User: lambda ctx: ('dm', ctx.id),
+    discord.Member: lambda ctx: ('dm', ctx.id),
+    discord.TextChannel: lambda ctx: ctx.id,
+    discord.VoiceChannel: lambda ctx: ctx.id,
+    discord.Thread: lambda ctx: ctx.id,
+    discord.Message: lambda ctx: ctx.channel.id,
+    discord.PartialMessage: lambda ctx: ctx.channel.id,
+}
+
+_CONTEXT_HANDLERS = {
+    discord.User: _channel_handler,
+    discord.Member: _channel_handler,
+    discord.TextChannel: _channel_handler,
+    discord.VoiceChannel: _channel_handler,
+    discord.Thread: _channel_handler,
+    discord.Message: _message_handler,
+    discord.PartialMessage: _message_handler,  # info messages of restored matches
+    discord.InteractionResponse: _interaction_response_handler,
+    discord.Webhook: _webhook_handler,
+    discord.Interaction: _interaction_handler,
+    discord.ApplicationContext: _application_context_handler,
+}
+
+
 class AllStrings(Enum):
     NOT_REGISTERED = "You are not registered {}, please go to {} first!"
     NOT_PLAYER = "You are not a player {}, please go to {} first!"
@@ -27,6 +94,7 @@ class AllStrings(Enum):
     CHECK_FAILURE = "You have failed a check to run this command!"
     UNASSIGNED_ONLINE = "{} Unassigned Login", account_online_check
     LOADER_TOGGLE = "FSBot {}ed"
+    OUTBOUND_STATS = "Outbound queue: {} requests queued.\nQueue latency by priority:\n{}"
     HELLO = "Hello there {}"
 
     LOG_ACCOUNT = "Account [{}] sent to player: ID: [{}], name: [{}]"
@@ -75,6 +143,13 @@ class AllStrings(Enum):
     LOBBY_DASHBOARD = ''
     LOBBY_LONGER_HISTORY = '{}', longer_lobby_logs
     LOBBY_NO_HISTORY = '{} there is no extended activity to display!'
+    LOBBY_COMPATIBLE = "{} compatible players in the lobby: {}"
+    LOBBY_NO_COMPATIBLE = "{} there are no compatible players in the lobby right now!"
+
+    RANKED_JOIN = "{} you have joined the ranked queue!"
+    RANKED_LEAVE = "{} you have left the ranked queue!"
+    RANKED_ALREADY_IN = "{} you are already in the ranked queue!"
+    RANKED_NOT_IN = "{} you are not in the ranked queue!"
 
     INVITE_WRONG_USER = "This invite isn\'t for you!"
 
@@ -91,10 +166,26 @@ class AllStrings(Enum):
     MATCH_TIMEOUT_RESET = "{} timeout reset!"
     MATCH_TIMEOUT = "{} Match is being closed due to inactivity"
     MATCH_END = "Match ID: {} Ended, closing match channel..."
+    MATCH_ROUND_REPORTED = "{} reported losing a round to {}. Score: {}"
+    MATCH_ROUND_CANT_REPORT = "You can't report a round for this match!"
+    MATCH_ROUND_TRACKED = "Rounds of this match are recorded automatically from kills, there is no round to confirm!"
+    MATCH_POOL_STATS = "Match channel pool: {} ready. Channel latency p50: {:.2f}s, p90: {:.2f}s, " \
+                       "p99: {:.2f}s, max: {:.2f}s, {:.0%} from the pool."
+    MATCH_LOOP_STATS = "Last {} match update ticks: average {:.2f}s, max {:.2f}s. " \
+                       "Per tick: {:.1f} updated, {:.1f} skipped as unchanged, {:.1f} failed."
+    MATCH_LOOP_NO_STATS = "No match update ticks yet."
+    MATCH_POOL_NO_STATS = "Match channel pool: {} ready. No matches created yet."
     MATCH_NOT_FOUND = "Match for channel {} not found!"
     MATCH_NOT_IN = "Player {} is not in match {}."
     MATCH_ALREADY = "{} is already in match {}."
 
+    ELO_RECOMPUTE_START = "Recomputing all ratings from ranked match history..."
+    ELO_RECOMPUTE_DONE = "Replayed {} ranked matches, rebuilt {} player ratings in {:.2f}s."
+
+    LEADERBOARD = "", leaderboard
+    LEADERBOARD_RANK = "{} you are ranked #{} of {} with {} Elo, above {:.1f}% of rated players."
+    LEADERBOARD_UNRANKED = "{} you are not ranked yet, play a ranked match to get on the leaderboard!"
+
     SKILL_LEVEL_REQ_ONE = "Your requested skill level has been set to: {}."
     SKILL_LEVEL_REQ_MORE = "Your requested skill levels have been set to: {}."
     SKILL_LEVEL = "Your skill level has been set to: {}."
@@ -117,6 +208,8 @@ class AllStrings(Enum):
     def __init__(self, string, embed=None):
         self.__string = string
         self.__embed = embed
+        #  Embed parameter names, computed once so sends only filter kwargs
+        self.__embed_params = tuple(inspect.signature(embed).parameters) if embed else ()
 
     def __call__(self, *args):
         return self.__string.format(*args)
@@ -125,68 +218,47 @@ class AllStrings(Enum):
         args_dict = {}
         if self.__string:
             args_dict['content'] = self.__string.format(*args)
-        if self.__embed and not kwargs.get('embed'):
-            #  Checks if embed, then retrieves only the embed specific kwargs
-            embed_sig = inspect.signature(self.__embed)
-            embed_kwargs = {arg: kwargs.get(arg) for arg in embed_sig.parameters}
-            args_dict['embed'] = self.__embed(**embed_kwargs)
-        if kwargs.get('embed'):
-            args_dict['embeds'] = [kwargs.get('embed')]
+        embed = kwargs.get('embed')
+        if embed:
+            args_dict['embeds'] = [embed]
+        elif self.__embed:
+            #  Retrieves only the embed specific kwargs
+            args_dict['embed'] = self.__embed(**{arg: kwargs.get(arg) for arg in self.__embed_params})
         if kwargs.get('embeds'):
-            args_dict['embeds'] = kwargs.get('embeds')
-        if kwargs.get('view') is not None:
-            args_dict['view'] = None if not kwargs.get('view') else kwargs.get('view')
-        if kwargs.get('files'):
-            files = kwargs.get('files')
-            if type(files) is not list:
-                files = list(files)
-            args_dict['files'] = files
+            args_dict['embeds'] = kwargs['embeds']
+        view = kwargs.get('view')
+        if view is not None:
+            args_dict['view'] = view or None
+        files = kwargs.get('files')
+        if files:
+            args_dict['files'] = files if type(files) is list else list(files)
         if kwargs.get('delete_after'):
-            args_dict['delete_after'] = kwargs.get('delete_after')
+            args_dict['delete_after'] = kwargs['delete_after']
         if kwargs.get('ephemeral'):
-            args_dict['ephemeral'] = kwargs.get('ephemeral')
-        if kwargs.get('allowed_mentions') is not None:
-            if not kwargs.get('allowed_mentions'):
-                args_dict['allowed_mentions'] = discord.AllowedMentions.none()
-            else:
-                args_dict['allowed_mentions'] = kwargs.get('allowed_mentions')
+            args_dict['ephemeral'] = kwargs['ephemeral']
+        allowed_mentions = kwargs.get('allowed_mentions')
+        if allowed_mentions is not None:
+            args_dict['allowed_mentions'] = allowed_mentions or discord.AllowedMentions.none()
         if kwargs.get('remove_embed'):
             args_dict['embed'] = None
 
-        match type(ctx):
-            case discord.User | discord.Member | discord.TextChannel | discord.VoiceChannel | discord.Thread:
-                return await getattr(ctx, action)(**args_dict)
-
-            case discord.Message:
-                if action == "send":
-                    return await getattr(ctx, "reply")(**args_dict)
-                if action == "edit":
-                    return await getattr(ctx, action)(**args_dict)
-
-            case discord.InteractionResponse:
-                return await getattr(ctx, action + '_message')(**args_dict)
-
-            case discord.Webhook if ctx.type == discord.WebhookType.application:
-                if action == "send":
-                    return await getattr(ctx, 'send')(**args_dict)
-                if action == "edit":  # Probably (definitely) doesn't work
-                    return await getattr(await ctx.fetch_message(), 'edit_message')(**args_dict)
-
-            case discord.Interaction:
-                if ctx.response.is_done() and action == 'send':
-                    return await getattr(ctx.followup, 'send')(**args_dict)
-                return await getattr(ctx.response, action + '_message')(**args_dict)
-
-            case discord.ApplicationContext:
-                if action == "send":
-                    return await getattr(ctx, "respond")(**args_dict)
-                if action == "edit":
-                    return await getattr(ctx, action)(**args_dict)
+        try:
+            handler = _CONTEXT_HANDLERS[type(ctx)]
+        except KeyError:
+            raise UnexpectedError(f"Unrecognized Context, {type(ctx)}")
 
-            case _:
-                raise UnexpectedError(f"Unrecognized Context, {type(ctx)}")
+        route = _ROUTES.get(type(ctx))
+        if route is None:
+            return await handler(ctx, action, args_dict)
+        #  Queued edits of the same message are coalesced, last edit wins
+        coalesce_key = ('edit', ctx.id) if action == 'edit' and type(ctx) in (discord.Message, discord.PartialMessage) \
+            else None
+        return await outbound.submit(route(ctx), lambda: handler(ctx, action, args_dict),
+                                     priority=kwargs.get('priority', Priority.NORMAL), coalesce_key=coalesce_key)
 
     async def send(self, ctx, *args, **kwargs):
+        """Send the string / embed to ctx.  Channel, user and message sends are queued through the outbound
+        scheduler, pass priority=Priority.X to change their priority"""
         return await self._do_send('send', ctx, *args, **kwargs)
 
     async def edit(self, ctx, *args, **kwargs):
@@ -10,10 +10,10 @@ import traceback
 import modules.discord_obj as d_obj
 import modules.lobby as lobby
 from modules.spam_detector import is_spam
-import modules.tools as tools
 from classes import Player
 from display import AllStrings as disp
 import modules.accounts_handler as accounts
+import modules.duel_tracker as duel_tracker
 from modules.loader import is_all_locked
 
 
@@ -51,7 +51,7 @@ class InviteView(FSBotView):
     """View to handle accepting or declining match invites"""
 
     def __init__(self, owner, player):
-        super().__init__(timeout=300)
+        super().__init__(timeout=lobby.INVITE_TIMEOUT)
         self.owner: Player = owner
         self.player = player
         self.msg = None
@@ -97,6 +97,8 @@ class MatchInfoView(FSBotView):
         if not self.match.should_warn:
             self.reset_timeout_button.style = discord.ButtonStyle.grey
             self.reset_timeout_button.disabled = True
+        if not self.match.ranked:
+            self.remove_item(self.report_loss_button)
 
     @discord.ui.button(label="Leave Match", style=discord.ButtonStyle.red)
     async def leave_button(self, button: discord.Button, inter: discord.Interaction):
@@ -110,10 +112,29 @@ class MatchInfoView(FSBotView):
     @discord.ui.button(label="Reset Timeout", style=discord.ButtonStyle.green)
     async def reset_timeout_button(self, button: discord.Button, inter: discord.Interaction):
         """Resets the match from timeout"""
-        self.match.timeout_at = tools.timestamp_now()
+        self.match.reset_timeout()
         await disp.MATCH_TIMEOUT_RESET.send_temp(self.match.text_channel, inter.user.mention)
         await self.match.update_embed()
 
+    @discord.ui.button(label="Report Round Lost", style=discord.ButtonStyle.grey)
+    async def report_loss_button(self, button: discord.Button, inter: discord.Interaction):
+        """Ranked matches, reports a round lost by the player, so results are self-reported by the loser"""
+        await inter.response.defer()
+        p: Player = Player.get(inter.user.id)
+        if not await d_obj.is_registered(inter, p):
+            return
+        opponents = [ap for ap in self.match.ranked_players if ap.id != p.id]
+        if len(opponents) != 1:
+            await disp.MATCH_ROUND_CANT_REPORT.send_priv(inter)
+            return
+        if not await self.match.report_round(opponents[0].id, manual=True):
+            if duel_tracker.covers(self.match):
+                await disp.MATCH_ROUND_TRACKED.send_priv(inter)
+            else:
+                await disp.MATCH_ROUND_CANT_REPORT.send_priv(inter)
+            return
+        await disp.MATCH_ROUND_REPORTED.send(inter, p.mention, opponents[0].mention, self.match.score_str)
+
     @discord.ui.button(label="Request Account", style=discord.ButtonStyle.blurple)
     async def account_button(self, button: discord.Button, inter: discord.Interaction):
         """Requests an account for the player"""
@@ -24,6 +24,8 @@ import modules.discord_obj as d_obj
 import modules.database
 import modules.loader as loader
 import modules.signal
+import modules.message_router
+import modules.leaderboard
 import classes
 import display
 import modules.spam_detector as spam
@@ -152,7 +154,11 @@ async def on_application_command_error(context, exception):
 modules.database.init(cfg.database)
 modules.database.get_all_elements(classes.Player.new_from_data, 'users')
 log.info("Loaded Players from Database: %s", len(classes.Player.get_all_players()))
+modules.database.get_all_elements(classes.PlayerStats.new_from_data, 'user_stats')
+log.info("Loaded Player Stats from Database: %s", len(classes.PlayerStats.get_all_stats()))
+modules.leaderboard.init()
 
 modules.signal.init(bot)
+modules.message_router.init(bot)
 loader.init(bot)
 bot.run(cfg.general['token'])
@@ -16,6 +16,7 @@ import modules.config as cfg
 import modules.census as census
 import modules.discord_obj as d_obj
 import modules.database as db
+from modules.outbound import Priority
 from display import AllStrings as disp, views
 
 eastern = pytz.timezone('US/Eastern')
@@ -213,7 +214,7 @@ async def send_account(acc: classes.Account = None, player: classes.Player = Non
     user = d_obj.bot.get_user(acc.a_player.id)
     for _ in range(3):
         try:
-            acc.message = await disp.ACCOUNT_EMBED.send(user, acc=acc, view=ValidateView(acc))
+            acc.message = await disp.ACCOUNT_EMBED.send(user, acc=acc, view=ValidateView(acc), priority=Priority.HIGH)
             if acc.message:
                 break
         except discord.Forbidden:
@@ -267,7 +268,7 @@ async def terminate(acc: classes.Account = None, player: classes.Player = None,
     if acc.message:
         for _ in range(3):
             try:
-                if await disp.ACCOUNT_LOG_OUT.send(user):
+                if await disp.ACCOUNT_LOG_OUT.send(user, priority=Priority.HIGH):
                     break
             except discord.Forbidden:
                 continue
@@ -0,0 +1,65 @@
+"""Relays message attachments, used by modmail.
+Attachments are downloaded concurrently and streamed in chunks, each held in memory up to SPOOL_THRESHOLD bytes
+before spilling to a temporary file.  Buffers are plain io objects, as py-cord only accepts io.IOBase file objects.
+Where the target can display links, attachments can be forwarded by URL instead, skipping the download entirely,
+though Discord CDN links are signed and expire, so forwarded content is lost after a while."""
+
+# External Imports
+import asyncio
+import io
+import tempfile
+from logging import getLogger
+
+import aiohttp
+import discord
+
+log = getLogger('fs_bot')
+
+SPOOL_THRESHOLD = 1024 * 1024  # bytes of an attachment held in memory before spilling to disk
+CHUNK_SIZE = 64 * 1024
+MAX_CONCURRENT = 4  # concurrent downloads, bounds memory use to MAX_CONCURRENT * SPOOL_THRESHOLD
+
+
+async def _fetch(session: aiohttp.ClientSession, attachment: discord.Attachment,
+                 semaphore: asyncio.Semaphore) -> discord.File:
+    async with semaphore:
+        spool = io.BytesIO()
+        try:
+            async with session.get(attachment.url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    if isinstance(spool, io.BytesIO) and spool.tell() + len(chunk) > SPOOL_THRESHOLD:
+                        spilled = tempfile.TemporaryFile()
+                        spilled.write(spool.getbuffer())
+                        spool.close()
+                        spool = spilled
+                    spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return discord.File(spool, filename=attachment.filename, spoiler=attachment.is_spoiler())
+
+
+async def fetch_files(attachments: list[discord.Attachment]) -> list[discord.File]:
+    """Download attachments concurrently, returning discord.File's ready to re-upload"""
+    if not attachments:
+        return []
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*[_fetch(session, a, semaphore) for a in attachments],
+                                       return_exceptions=True)
+    files = []
+    for attachment, result in zip(attachments, results):
+        if isinstance(result, Exception):
+            log.warning(f'Could not relay attachment {attachment.filename}: {result}')
+        else:
+            files.append(result)
+    if len(files) < len(attachments):
+        log.warning(f'Relayed {len(files)} of {len(attachments)} attachments')
+    return files
+
+
+def links(attachments: list[discord.Attachment]) -> str:
+    """Attachment URLs, one per line, for forwarding by URL"""
+    return '\n'.join([a.url for a in attachments])
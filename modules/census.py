@@ -4,16 +4,35 @@ Census module for tracking Jaeger players.  Currently used to ensure FS block ac
 """
 
 # External Imports
+import asyncio
+import json
 import auraxium
 from logging import getLogger
 
 # Internal Imports
 import modules.config as cfg
 import modules.accounts_handler as accounts
+import modules.tools as tools
 
 log = getLogger('fs_bot')
 
 WORLD_ID = 19
+SUBSCRIPTION_CHUNK = 100  # characters per login / logout subscription
+SYNC_DELAY = 1  # seconds, subscription changes within this window are sent together
+
+# Character scoped login / logout subscriptions.  Tracked characters are split into chunks of up to
+# SUBSCRIPTION_CHUNK, each chunk subscribed by its own pair of triggers, so tracking or untracking a character only
+# replaces the triggers of its chunk.  Triggers name characters only, as Census ORs character and world filters,
+# and removing a trigger is local to auraxium, so characters dropped from a chunk are cleared from the server.
+_client: auraxium.event.EventClient | None = None
+_actions: tuple | None = None  # (login action, logout action)
+_tracked: dict[int, int] = dict()  # char_id: chunk index
+_account_chars: set[int] = set()  # char_ids tracked for accounts
+_chunks: list[set[int]] = list()
+_chunk_triggers: dict[int, tuple[str, str]] = dict()  # chunk index: (login trigger name, logout trigger name)
+_chunk_subscribed: dict[int, set[str]] = dict()  # chunk index: char_ids subscribed by its current triggers
+_dirty_chunks: set[int] = set()
+_sync_handle: asyncio.TimerHandle | None = None
 
 
 def get_account_chars_list(account_dict: dict):
@@ -104,6 +123,87 @@ async def get_ids_facs_from_chars(chars_list) -> dict[str, tuple[int, int]] | bo
         return char_dict
 
 
+def track_chars(char_ids):
+    """Subscribe to login / logout events of char_ids"""
+    for char_id in char_ids:
+        if not char_id or char_id in _tracked:
+            continue
+        for i, chunk in enumerate(_chunks):
+            if len(chunk) < SUBSCRIPTION_CHUNK:
+                break
+        else:
+            i = len(_chunks)
+            _chunks.append(set())
+        _chunks[i].add(char_id)
+        _tracked[char_id] = i
+        _dirty_chunks.add(i)
+    _schedule_sync()
+
+
+def untrack_chars(char_ids):
+    for char_id in char_ids:
+        i = _tracked.pop(char_id, None)
+        if i is None:
+            continue
+        _chunks[i].discard(char_id)
+        _dirty_chunks.add(i)
+    _schedule_sync()
+
+
+def sync_accounts():
+    """Track the characters of the currently loaded accounts, untracking those of removed accounts"""
+    current = set(accounts.account_char_ids)
+    untrack_chars(_account_chars - current)
+    track_chars(current - _account_chars)
+    _account_chars.clear()
+    _account_chars.update(current)
+
+
+def tracked_chars() -> int:
+    return len(_tracked)
+
+
+def _schedule_sync():
+    global _sync_handle
+    if not _client or not _dirty_chunks or _sync_handle:
+        return
+    _sync_handle = asyncio.get_running_loop().call_later(SYNC_DELAY, _sync_subscriptions)
+
+
+def _sync_subscriptions():
+    """Replace the triggers of chunks changed since the last sync"""
+    global _sync_handle
+    if _sync_handle:
+        _sync_handle.cancel()
+        _sync_handle = None
+    login_action, logout_action = _actions
+    removed = set()
+    for i in _dirty_chunks:
+        removed |= _chunk_subscribed.get(i, set()) - {str(char_id) for char_id in _chunks[i]}
+    if removed and _client.websocket:  # cleared before the new subscriptions are sent
+        tools.background(_client.websocket.send(json.dumps(
+            {'service': 'event', 'action': 'clearSubscribe', 'characters': sorted(removed)})),
+            'clearing Census subscriptions')
+    for i in sorted(_dirty_chunks):
+        for name in _chunk_triggers.pop(i, ()):
+            _client.remove_trigger(name, keep_websocket_alive=True)
+        chars = [str(char_id) for char_id in _chunks[i]]
+        _chunk_subscribed[i] = set(chars)
+        if not chars:
+            continue
+        names = (f'login-{i}', f'logout-{i}')
+        # noinspection PyTypeChecker
+        _client.add_trigger(auraxium.Trigger(auraxium.event.PlayerLogin, characters=chars,
+                                             action=login_action, name=names[0]))
+        # noinspection PyTypeChecker
+        _client.add_trigger(auraxium.Trigger(auraxium.event.PlayerLogout, characters=chars,
+                                             action=logout_action, name=names[1]))
+        _chunk_triggers[i] = names
+    log.debug(f'Census subscriptions updated for {len(_dirty_chunks)} chunk(s), '
+              f'{len(_tracked)} characters tracked')
+    _dirty_chunks.clear()
+
+
 async def _login(char_id, acc_char_ids, player_char_ids):
     # Account Section
     if char_id in acc_char_ids:
@@ -152,27 +252,23 @@ async def _logout(char_id, acc_char_ids, player_char_ids):
 
 async def online_status_updater(chars_players_map_func):
     """Responsible for updating active player and account objects with their currently
-    online characters"""
-    acc_char_ids = accounts.account_char_ids
-
-    client = auraxium.event.EventClient(service_id=cfg.general['api_key'])
+    online characters.  Subscribes only to the tracked characters of players and accounts"""
+    global _client, _actions
 
     async def login_action(evt: auraxium.event.PlayerLogin):
         player_char_ids = chars_players_map_func()
-        await _login(evt.character_id, acc_char_ids, player_char_ids)
+        await _login(evt.character_id, accounts.account_char_ids, player_char_ids)
 
     async def logout_action(evt: auraxium.event.PlayerLogout):
         player_char_ids = chars_players_map_func()
-        await _logout(evt.character_id, acc_char_ids, player_char_ids)
-
-    # noinspection PyTypeChecker
-    login_trigger = auraxium.Trigger(auraxium.event.PlayerLogin, worlds=[WORLD_ID], action=login_action)
-
-    # noinspection PyTypeChecker
-    logout_trigger = auraxium.Trigger(auraxium.event.PlayerLogout, worlds=[WORLD_ID], action=logout_action)
-
-    client.add_trigger(login_trigger)
-    client.add_trigger(logout_trigger)
+        await _logout(evt.character_id, accounts.account_char_ids, player_char_ids)
+
+    _actions = (login_action, logout_action)
+    _client = auraxium.event.EventClient(service_id=cfg.general['api_key'])
+    track_chars(chars_players_map_func())
+    sync_accounts()
+    _dirty_chunks.update(range(len(_chunks)))
+    _sync_subscriptions()
 
 
 async def online_status_rest(chars_players_map):
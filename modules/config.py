@@ -38,6 +38,13 @@ factions = {
 #: Dictionary to retrieve faction id by name.
 i_factions = {v: k for k, v in factions.items()}
 
+#: Substrings identifying a link in #content-plug messages, domains and schemes.
+content_plug_links = ['.com', '.ru', '.net', '.org', '.info', '.biz', '.io', '.co', "https://", "http://", "www.",
+                      ".ca"]
+
+#: Hidden match channels kept ready for new matches, can be set by 'match_channel_pool_size' in 'General'.
+match_channel_pool_size = 3
+
 # http://census.daybreakgames.com/get/ps2:v2/zone?c:limit=100
 #: Dictionary to retrieve zone name by id.
 zones = {2: "Indar",
@@ -49,6 +56,7 @@ zones = {2: "Indar",
 ## Dynamic Variables, from .ini
 
 GAPI_SERVICE = ""
+config_version = 0  # incremented on every config load, used to invalidate values built from config
 
 # General
 general = {
@@ -95,7 +103,8 @@ _collections = {
     "matches": "",
     "accounts": "",
     "account_usages": "",
-    "restart_data": ""
+    "restart_data": "",
+    "elo_history": "elo_history"  # defaulted, so configs predating it still load
 }
 
 # Stored Data Config
@@ -109,7 +118,7 @@ database = {
 
 
 def get_config(config_path):
-    global GAPI_SERVICE
+    global GAPI_SERVICE, config_version, match_channel_pool_size
     GAPI_SERVICE = f'{pathlib.Path(__file__).parent.absolute()}/../service_account.json'
 
     file = f'{pathlib.Path(__file__).parent.absolute()}/../{config_path}'
@@ -134,6 +143,11 @@ def get_config(config_path):
             _error_missing(key, 'General', file)
         except ValueError:
             general[key] = (config['General'][key])
+    # Optional General fields, static defaults are kept if missing
+    try:
+        match_channel_pool_size = int(config['General'].get('match_channel_pool_size', match_channel_pool_size))
+    except ValueError:
+        _error_incorrect('match_channel_pool_size', 'General', file)
 
     # Emojis Section
     _check_section(config, 'Emojis', file)
@@ -169,7 +183,8 @@ def get_config(config_path):
         try:
             _collections[key] = config['Collections'][key]
         except KeyError:
-            _error_incorrect(key, 'Collections', file)
+            if not _collections[key]:  # collections without a default name are required
+                _error_incorrect(key, 'Collections', file)
 
     # Database Section
     _check_section(config, 'Database', file)
@@ -180,6 +195,8 @@ def get_config(config_path):
             except KeyError:
                 _error_incorrect(key, 'Database', file)
 
+    config_version += 1
+
 
 def _check_section(config, section, file):
     if section not in config:
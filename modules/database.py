@@ -5,7 +5,8 @@ Taken from POGBot, https://github.com/yakMM/POG-bot
 
 # External modules
 import pymongo.collection
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from asyncio import get_event_loop
 from logging import getLogger
 from typing import Callable
@@ -159,6 +160,20 @@ def get_last_element(collection: str) -> (dict, None):
     return items[0]
 
 
+def find_elements(collection: str, query: dict, projection: dict = None, sort: list = None) -> list[dict]:
+    """
+    Get all elements matching a query.
+
+    :param collection: Collection name.
+    :param query: Filter to match elements against.
+    :param projection: Fields to return, all fields if None.
+    :param sort: List of (field, direction) to sort by.
+    :return: List of elements found.
+    """
+    items = _collections[collection].find(filter=query, projection=projection, sort=sort)
+    return list(items)
+
+
 def get_field(collection: str, e_id: int, specific: str):
     """
     Get one field of a single element.
@@ -188,6 +203,55 @@ def set_element(collection: str, e_id: id, data: dict):
         _collections[collection].insert_one(data)
 
 
+def bulk_set_elements(collection: str, elements: list[dict]):
+    """
+    Set many whole elements in a single bulk write. Replace elements that already exist.
+
+    :param collection: Collection name.
+    :param elements: Elements data, each with an _id.
+    """
+    if not elements:
+        return
+    _collections[collection].bulk_write([ReplaceOne({"_id": e["_id"]}, e, upsert=True) for e in elements],
+                                        ordered=False)
+
+
+def failed_indexes(error: BulkWriteError, count: int) -> list[int]:
+    """
+    Indexes of the operations of a failed bulk write that were not applied.
+
+    :param error: Error raised by the bulk write.
+    :param count: Number of operations in the bulk write.
+    :return: Sorted indexes of the failed operations, every index if the write concern failed.
+    """
+    if error.details.get('writeConcernErrors'):
+        return list(range(count))
+    return sorted({e['index'] for e in error.details.get('writeErrors', [])})
+
+
+def bulk_update_elements(collection: str, updates: list[tuple]):
+    """
+    Apply many update documents in a single bulk write. Create elements that do not already exist.
+
+    :param collection: Collection name.
+    :param updates: List of (element id, update document).
+    """
+    if not updates:
+        return
+    _collections[collection].bulk_write([UpdateOne({"_id": e_id}, doc, upsert=True) for e_id, doc in updates],
+                                        ordered=False)
+
+
+def remove_elements(collection: str, query: dict):
+    """
+    Remove all elements matching a query.
+
+    :param collection: Collection name.
+    :param query: Filter to match elements against.
+    """
+    _collections[collection].delete_many(query)
+
+
 def remove_element(collection: str, e_id: int):
     """
     Remove an element from the database.
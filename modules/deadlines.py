@@ -0,0 +1,98 @@
+"""Deadline scheduler, runs callbacks at given timestamps.
+Deadlines are kept in one heap served by a single task, which sleeps until the earliest deadline rather than
+polling.  Scheduling a key again replaces its deadline, cancelled entries are dropped lazily as they reach the
+top of the heap."""
+
+# External Imports
+import asyncio
+import heapq
+import itertools
+import time
+from logging import getLogger
+from typing import Callable, Awaitable, Hashable
+
+# Internal Imports
+import modules.tools as tools
+
+log = getLogger('fs_bot')
+
+clock: Callable[[], float] = time.time  # swappable for a fake clock
+
+_heap: list[list] = []  # entries, [when, seq, key, callback], callback set to None once cancelled
+_entries: dict[Hashable, list] = dict()  # live entry by key
+_seq = itertools.count()
+_wakeup: asyncio.Event | None = None
+_worker: asyncio.Task | None = None
+
+
+def schedule(key: Hashable, when: float, callback: Callable[[], Awaitable]):
+    """Call callback() at timestamp when, replacing any deadline already scheduled for key"""
+    cancel(key)
+    entry = [when, next(_seq), key, callback]
+    _entries[key] = entry
+    heapq.heappush(_heap, entry)
+    _ensure_worker()
+    if _heap[0] is entry:  # new earliest deadline, wake the worker to sleep for less
+        _wakeup.set()
+
+
+def cancel(key: Hashable) -> bool:
+    entry = _entries.pop(key, None)
+    if entry is None:
+        return False
+    entry[3] = None
+    return True
+
+
+def scheduled(key: Hashable) -> float | None:
+    """Timestamp a key is scheduled for, None if not scheduled"""
+    entry = _entries.get(key)
+    return entry[0] if entry else None
+
+
+def pending() -> int:
+    return len(_entries)
+
+
+def pop_due(now: float) -> list[tuple[Hashable, Callable[[], Awaitable]]]:
+    """Remove and return the (key, callback) of every deadline at or before now, in deadline order"""
+    due = []
+    while _heap and _heap[0][0] <= now:
+        when, _, key, callback = heapq.heappop(_heap)
+        if callback is None:
+            continue
+        del _entries[key]
+        due.append((key, callback))
+    return due
+
+
+def next_deadline() -> float | None:
+    while _heap and _heap[0][3] is None:
+        heapq.heappop(_heap)
+    return _heap[0][0] if _heap else None
+
+
+def _ensure_worker():
+    global _wakeup, _worker
+    if _worker is None or _worker.done():
+        _wakeup = asyncio.Event()
+        _worker = asyncio.create_task(_run())
+
+
+async def _fire(key, callback):
+    try:
+        await callback()
+    except Exception as e:
+        log.exception(f'Error in deadline callback for {key}', exc_info=e)
+
+
+async def _run():
+    while True:
+        for key, callback in pop_due(clock()):
+            tools.background(_fire(key, callback), f'deadline {key}')
+        when = next_deadline()
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=None if when is None else max(0.0, when - clock()))
+        except asyncio.TimeoutError:
+            pass
@@ -3,7 +3,8 @@ Handles interactions with commonly used discord objects, and role updates
 """
 
 #  External Imports
-from typing import Union
+import asyncio
+from typing import Union, Callable
 from logging import getLogger
 
 import discord
@@ -11,6 +12,7 @@ import discord
 # Internal Imports
 import modules.config as cfg
 import classes.players
+import modules.tools as tools
 from display import AllStrings as disp
 
 log = getLogger('fs_bot')
@@ -25,6 +27,12 @@ roles: dict[str, discord.Role] = {}
 channels: dict[str, Union[discord.TextChannel, discord.VoiceChannel]] = {}
 categories: dict[str, discord.CategoryChannel | None] = {'user': None, 'admin': None}
 
+# DM fan-out
+DM_FANOUT_LIMIT = 5  # max concurrent DM sends
+DM_RETRIES = 3  # attempts for transient (5xx) failures
+DMS_CLOSED_TTL = 3600  # seconds a user is remembered as not accepting DM's
+_dms_closed: dict[int, int] = dict()  # user_id: stamp the entry expires
+
 
 def init(client):
     global bot
@@ -78,3 +86,46 @@ async def is_registered(ctx, user: discord.Member | discord.User | classes.Playe
 async def d_log(message, user=None) -> bool:
     """Utility function to send logs to #logs channel"""
     return True if await disp.LOG_ERROR.send(channels['logs'], user, message, colin.mention) else False
+
+
+def dms_closed(user_id: int) -> bool:
+    """Returns True if the user recently refused a DM from the bot"""
+    expiry = _dms_closed.get(user_id)
+    if expiry is None:
+        return False
+    if expiry < tools.timestamp_now():
+        del _dms_closed[user_id]
+        return False
+    return True
+
+
+async def send_dms(users: list, send_func: Callable, limit: int = DM_FANOUT_LIMIT) -> tuple[list, list]:
+    """Concurrently DM users via send_func(user), with at most limit sends in flight.
+    Forbidden and NotFound are permanent and not retried, users refusing DM's are cached for DMS_CLOSED_TTL
+    and skipped on later calls.  Returns (users sent to, users that could not be sent to)."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _send(user) -> bool:
+        if dms_closed(user.id):
+            return False
+        async with semaphore:
+            for attempt in range(DM_RETRIES):
+                try:
+                    await send_func(user)
+                    return True
+                except discord.Forbidden:
+                    _dms_closed[user.id] = tools.timestamp_now() + DMS_CLOSED_TTL
+                    return False
+                except discord.NotFound:
+                    return False
+                except discord.HTTPException as e:
+                    if e.status < 500 or attempt == DM_RETRIES - 1:
+                        log.warning(f'Could not DM user {user.id}: {e}')
+                        return False
+                    await asyncio.sleep(2 ** attempt)
+        return False
+
+    results = await asyncio.gather(*[_send(user) for user in users])
+    sent = [user for user, success in zip(users, results) if success]
+    failed = [user for user, success in zip(users, results) if not success]
+    return sent, failed
@@ -0,0 +1,97 @@
+"""Tracks ranked duel rounds from Census kill events.
+One world wide Death / VehicleDestroy subscription serves every match, so matches starting and ending never
+re-subscribe.  Events are filtered through a char_id: (match, player_id) index, so events for characters outside
+ranked matches cost two dict lookups.  A kill of one match player by their opponent wins them the round, the
+Death and VehicleDestroy events from a single ESF kill are debounced into one round."""
+
+# External Imports
+import auraxium
+from logging import getLogger
+
+# Internal Imports
+import modules.config as cfg
+
+log = getLogger('fs_bot')
+
+WORLD_ID = 19
+DEBOUNCE = 5  # seconds, further kills of the same victim in a match within this window are the same round
+
+_chars: dict[int, tuple['BaseMatch', int]] = dict()  # char_id: (match, player_id)
+_match_chars: dict[int, set[int]] = dict()  # match_id: char_ids indexed for the match
+_last_kill: dict[tuple[int, int], int] = dict()  # (match_id, victim player_id): stamp of last counted kill
+_client: auraxium.event.EventClient | None = None
+
+
+def _player_chars(player) -> list[int]:
+    if player.has_own_account:
+        ids = player.ig_ids
+    elif player.account:
+        ids = player.account.ig_ids
+    else:
+        return []
+    return [char_id for char_id in ids if char_id]
+
+
+def track_match(match):
+    """Index the characters of a ranked matches players, called on creation and again on login, as players may
+    have been assigned an account since"""
+    chars = _match_chars.setdefault(match.id, set())
+    for a_player in match.ranked_players:
+        for char_id in _player_chars(a_player.player):
+            _chars[char_id] = (match, a_player.id)
+            chars.add(char_id)
+
+
+def untrack_match(match):
+    for char_id in _match_chars.pop(match.id, ()):
+        if _chars.get(char_id, (None,))[0] is match:
+            del _chars[char_id]
+    for key in [k for k in _last_kill if k[0] == match.id]:
+        del _last_kill[key]
+
+
+def covers(match) -> bool:
+    """Whether kills of every ranked player of match are tracked, so rounds are recorded without reports"""
+    p_ids = {_chars[char_id][1] for char_id in _match_chars.get(match.id, ()) if char_id in _chars}
+    return bool(match.ranked_players) and all(p.id in p_ids for p in match.ranked_players)
+
+
+def tracked() -> int:
+    return len(_chars)
+
+
+def attribute_kill(attacker_id: int, victim_id: int, stamp: int) -> tuple['BaseMatch', int] | None:
+    """Attribute a kill to a round, returns (match, winner player_id) if it wins a round, None otherwise"""
+    victim = _chars.get(victim_id)
+    if victim is None:
+        return None
+    attacker = _chars.get(attacker_id)
+    if attacker is None:
+        return None
+    match, victim_p_id = victim
+    if attacker[0] is not match or attacker[1] == victim_p_id:  # different match, or suicide / team kill
+        return None
+    key = (match.id, victim_p_id)
+    if stamp - _last_kill.get(key, -DEBOUNCE) < DEBOUNCE:
+        return None
+    _last_kill[key] = stamp
+    return match, attacker[1]
+
+
+async def _on_kill(evt):
+    result = attribute_kill(evt.attacker_character_id, evt.character_id, int(evt.timestamp.timestamp()))
+    if result:
+        match, winner_id = result
+        await match.report_round(winner_id)
+
+
+def start():
+    """Subscribe to kill events, once for the bots lifetime"""
+    global _client
+    if _client:
+        return
+    _client = auraxium.event.EventClient(service_id=cfg.general['api_key'])
+    # noinspection PyTypeChecker
+    _client.add_trigger(auraxium.Trigger(auraxium.event.Death, auraxium.event.VehicleDestroy,
+                                         worlds=[WORLD_ID], action=_on_kill))
+    log.info('Duel tracker subscribed to kill events')
@@ -0,0 +1,119 @@
+"""Compact per player Elo history, stored apart from player stats in the elo_history collection.
+A players history is chunked into bucket documents of BUCKET_SIZE entries, {_id: '<player_id>-<bucket>'},
+each holding parallel int arrays of match ids, Elo deltas (in hundredths) and stamps.  Entry i of a player
+lives in bucket i // BUCKET_SIZE, so recent entries are read from the last bucket or two, and time ranges from
+the buckets whose first/last stamps overlap the range, never the whole history.
+Entries are written by index rather than appended, so a write retried after a partial failure never duplicates
+entries.  Writes of a player must be made in order, starting at their first unwritten entry."""
+
+# External Imports
+from logging import getLogger
+
+# Internal Imports
+import modules.database as db
+from classes.player_stats import PlayerStats
+
+log = getLogger('fs_bot')
+
+BUCKET_SIZE = 500
+
+
+def bucket_id(p_id: int, bucket: int) -> str:
+    return f'{p_id}-{bucket}'
+
+
+def _place(field: str, offset: int, values: list[int]) -> dict | list[int]:
+    """Pipeline expression setting a bucket array from offset onwards to values, keeping the entries before offset"""
+    if not offset:
+        return values
+    return {'$concatArrays': [{'$slice': [{'$ifNull': [f'${field}', []]}, offset]}, values]}
+
+
+def _bucket_updates(p_id: int, first_index: int, entries: list[tuple[int, int, int]]) -> list[tuple[str, list]]:
+    """Per bucket pipeline updates writing entries from a players history index first_index"""
+    updates = []
+    i = 0
+    while i < len(entries):
+        bucket, offset = divmod(first_index + i, BUCKET_SIZE)
+        chunk = entries[i:i + BUCKET_SIZE - offset]
+        match_ids, deltas, stamps = zip(*chunk)
+        updates.append((bucket_id(p_id, bucket), [{'$set': {
+            'player': p_id, 'bucket': bucket,
+            'match_ids': _place('match_ids', offset, list(match_ids)),
+            'deltas': _place('deltas', offset, list(deltas)),
+            'stamps': _place('stamps', offset, list(stamps)),
+            'first_stamp': {'$min': ['$first_stamp', min(stamps)]},
+            'last_stamp': {'$max': ['$last_stamp', max(stamps)]}
+        }}]))
+        i += len(chunk)
+    return updates
+
+
+def write_history(history: list[tuple[int, int, list]]) -> list[tuple[int, int, list]]:
+    """Write new history entries, as returned by PlayerStats.take_dirty, in one bulk write.
+    Returns the history of players with a failed bucket write, to be re-queued"""
+    updates, owners = [], []
+    for i, (p_id, first_index, entries) in enumerate(history):
+        p_updates = _bucket_updates(p_id, first_index, entries)
+        updates.extend(p_updates)
+        owners.extend([i] * len(p_updates))
+    try:
+        db.bulk_update_elements('elo_history', updates)
+    except db.BulkWriteError as e:
+        failed = {owners[i] for i in db.failed_indexes(e, len(updates))}
+        return [history[i] for i in sorted(failed)]
+    return []
+
+
+def build_buckets(p_id: int, entries: list[tuple[int, int, int]]) -> list[dict]:
+    """Whole bucket documents for a players full history, used when rebuilding history"""
+    buckets = []
+    for bucket, i in enumerate(range(0, len(entries), BUCKET_SIZE)):
+        match_ids, deltas, stamps = zip(*entries[i:i + BUCKET_SIZE])
+        buckets.append({'_id': bucket_id(p_id, bucket), 'player': p_id, 'bucket': bucket,
+                        'first_stamp': min(stamps), 'last_stamp': max(stamps),
+                        'match_ids': list(match_ids), 'deltas': list(deltas), 'stamps': list(stamps)})
+    return buckets
+
+
+def _entries(bucket: dict) -> list[tuple[int, float, int]]:
+    return [(m_id, delta / 100, stamp)
+            for m_id, delta, stamp in zip(bucket['match_ids'], bucket['deltas'], bucket['stamps'])]
+
+
+def _pending(p_id: int) -> list[tuple[int, float, int]]:
+    stats = PlayerStats.get_all_stats().get(p_id)
+    if not stats:
+        return []
+    return [(m_id, delta / 100, stamp) for m_id, delta, stamp in stats.pending_history]
+
+
+def get_recent_history(p_id: int, n: int) -> list[tuple[int, float, int]]:
+    """Last n history entries of a player, oldest first, as (match_id, elo delta, stamp)"""
+    stats = PlayerStats.get_all_stats().get(p_id)
+    if not stats or n <= 0:
+        return []
+    pending = _pending(p_id)
+    written = stats.history_count - len(pending)
+    needed = min(n - len(pending), written)
+    entries = []
+    if needed > 0:
+        first_bucket = (written - needed) // BUCKET_SIZE
+        last_bucket = (written - 1) // BUCKET_SIZE
+        ids = [bucket_id(p_id, b) for b in range(first_bucket, last_bucket + 1)]
+        for bucket in db.find_elements('elo_history', {'_id': {'$in': ids}}, sort=[('bucket', 1)]):
+            entries.extend(_entries(bucket))
+    entries.extend(pending)
+    return entries[-n:]
+
+
+def get_history_range(p_id: int, start: int, end: int) -> list[tuple[int, float, int]]:
+    """History entries of a player with stamps between start and end inclusive, as (match_id, elo delta, stamp)"""
+    entries = []
+    buckets = db.find_elements('elo_history',
+                               {'player': p_id, 'first_stamp': {'$lte': end}, 'last_stamp': {'$gte': start}},
+                               sort=[('bucket', 1)])
+    for bucket in buckets:
+        entries.extend(_entries(bucket))
+    entries.extend(_pending(p_id))
+    return [e for e in entries if start <= e[2] <= end]
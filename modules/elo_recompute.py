@@ -0,0 +1,129 @@
+"""Rebuilds every players rating by replaying ranked match history, used after K_FACTOR or SCALE_FACTOR change.
+Ratings are held in a NumPy array indexed by player, consecutive matches sharing no players are updated together
+as one vectorized step, so the replay stays chronological while running in C.
+
+Ranked matches store their result in the 'ranked' field of the match document:
+    {'players': [player1_id, player2_id], 'round_wins': [player1_wins, player2_wins], 'match_length': 7}
+"""
+
+# External Imports
+import time
+from logging import getLogger
+
+import numpy as np
+
+# Internal Imports
+import modules.database as db
+import modules.stats_handler as stats_handler
+import modules.ranked_queue as ranked_queue
+import modules.elo_history as elo_history
+import modules.leaderboard as leaderboard
+from classes.player_stats import PlayerStats
+
+log = getLogger('fs_bot')
+
+BASE_ELO = 1000
+
+
+def _default_data(p_id, elo=BASE_ELO) -> dict:
+    return {'_id': p_id, 'history_count': 0, 'elo': elo, 'match_wins': 0, 'match_losses': 0}
+
+
+def _load_matches() -> list[dict]:
+    return db.find_elements('matches', {'ranked': {'$exists': True}},
+                            projection={'ranked': True, 'end_stamp': True}, sort=[('end_stamp', 1), ('_id', 1)])
+
+
+def replay(matches: list[dict]) -> tuple[dict[int, dict], dict[int, list]]:
+    """Replay ranked matches in order, returns stats data and history entries by player_id"""
+    n = len(matches)
+    match_ids = np.fromiter((m['_id'] for m in matches), dtype=np.int64, count=n)
+    pairs = np.array([m['ranked']['players'] for m in matches], dtype=np.int64).reshape(n, 2)
+    wins = np.array([m['ranked']['round_wins'] for m in matches], dtype=np.float64).reshape(n, 2)
+    lengths = np.fromiter((m['ranked'].get('match_length', 7) for m in matches), dtype=np.float64, count=n)
+    stamps = [m.get('end_stamp') or 0 for m in matches]
+
+    player_ids, idx = np.unique(pairs, return_inverse=True)
+    idx = idx.reshape(n, 2)
+    ratings = np.full(len(player_ids), BASE_ELO, dtype=np.float64)
+
+    # Same scoring as stats_handler, a players net round wins scaled to [0, 1] by match length
+    net = (wins[:, 0] - wins[:, 1]) / ((lengths // 2) + 1)
+    scores = np.empty((n, 2))
+    scores[:, 0] = 0.5 + net / 2
+    scores[:, 1] = 0.5 - net / 2
+    deltas = np.empty((n, 2))
+
+    # Split into batches of consecutive matches with no player in common
+    start = 0
+    seen = set()
+    batch_bounds = []
+    for i, (a, b) in enumerate(idx.tolist()):
+        if a in seen or b in seen:
+            batch_bounds.append((start, i))
+            start = i
+            seen.clear()
+        seen.add(a)
+        seen.add(b)
+    if n:
+        batch_bounds.append((start, n))
+
+    k, scale = stats_handler.K_FACTOR, stats_handler.SCALE_FACTOR
+    for lo, hi in batch_bounds:
+        p1, p2 = idx[lo:hi, 0], idx[lo:hi, 1]
+        r1, r2 = ratings[p1], ratings[p2]
+        xpt1 = 1 / (1 + 10 ** ((r2 - r1) / scale))
+        d1 = k * (scores[lo:hi, 0] - xpt1)
+        d2 = k * (scores[lo:hi, 1] - (1 - xpt1))
+        ratings[p1] = r1 + d1
+        ratings[p2] = r2 + d2
+        deltas[lo:hi, 0] = d1
+        deltas[lo:hi, 1] = d2
+
+    # Build stats documents and history entries, deltas in hundredths as stored by elo_history
+    results = {p_id: _default_data(p_id, elo) for p_id, elo in zip(player_ids.tolist(), ratings.tolist())}
+    history = {p_id: [] for p_id in results}
+    winners = np.sign(net).astype(np.int8).tolist()
+    centi_deltas = np.rint(deltas * 100).astype(np.int64).tolist()
+    for m_id, (p1_id, p2_id), (d1, d2), winner, stamp in zip(match_ids.tolist(), pairs.tolist(), centi_deltas,
+                                                             winners, stamps):
+        for p_id, delta, won in ((p1_id, d1, winner == 1), (p2_id, d2, winner == -1)):
+            data = results[p_id]
+            data['history_count'] += 1
+            history[p_id].append((m_id, delta, stamp))
+            if won:
+                data['match_wins'] += 1
+            elif winner:
+                data['match_losses'] += 1
+    return results, history
+
+
+def _write(results: dict[int, dict], history: dict[int, list]):
+    data = list(results.values())
+    # players without ranked matches are reset
+    data.extend([_default_data(p_id) for p_id in list(PlayerStats.get_all_stats()) if p_id not in results])
+    buckets = []
+    for p_id, entries in history.items():
+        buckets.extend(elo_history.build_buckets(p_id, entries))
+    db.remove_elements('elo_history', {})
+    db.bulk_set_elements('elo_history', buckets)
+    db.bulk_set_elements('user_stats', data)
+    return data
+
+
+async def recompute() -> tuple[int, int, float]:
+    """Recompute all ratings from the matches collection, replacing the ratings table.
+    Returns (matches replayed, players updated, seconds taken)"""
+    start = time.perf_counter()
+    async with stats_handler.flush_lock:  # no flush may write stats or history over the rebuilt data
+        matches = await db.async_db_call(_load_matches)
+        results, history = await db.async_db_call(replay, matches)
+        data = await db.async_db_call(_write, results, history)
+        PlayerStats.clear_dirty()
+        for stats_data in data:
+            stats = PlayerStats.new_from_data(stats_data)
+            ranked_queue.set_rating(stats.id, stats.elo)
+        leaderboard.init()
+    elapsed = time.perf_counter() - start
+    log.info(f'Recomputed {len(data)} ratings from {len(matches)} ranked matches in {elapsed:.2f}s')
+    return len(matches), len(data), elapsed
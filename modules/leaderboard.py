@@ -0,0 +1,77 @@
+"""Leaderboard of rated players, kept in a SortedList ordered by Elo and updated incrementally as ratings change.
+Top N, rank and percentile queries are O(log n), so a page's entries are cheap to compare against a rendered page,
+and pages are only re-rendered once their ranks have changed."""
+
+# External Imports
+from logging import getLogger
+
+from sortedcontainers import SortedList
+
+# Internal Imports
+from classes.player_stats import PlayerStats
+
+log = getLogger('fs_bot')
+
+PAGE_SIZE = 10
+
+_ranking = SortedList()  # (-elo, player_id), highest rating first
+_keys: dict[int, tuple[float, int]] = dict()  # player_id: key in _ranking
+
+
+def init():
+    """Build the leaderboard from the ratings table, players are ranked once they've played a rated match"""
+    _ranking.clear()
+    _keys.clear()
+    _keys.update({s.id: (-s.elo, s.id) for s in PlayerStats.get_all_stats().values() if s.history_count})
+    _ranking.update(_keys.values())
+    log.info(f'Leaderboard initialized with {len(_ranking)} rated players')
+
+
+def update(p_id: int, elo: float):
+    """Insert or move a player after a rating change"""
+    old_key = _keys.get(p_id)
+    new_key = (-elo, p_id)
+    if old_key == new_key:
+        return
+    if old_key:
+        _ranking.remove(old_key)
+    _ranking.add(new_key)
+    _keys[p_id] = new_key
+
+
+def remove(p_id: int):
+    key = _keys.pop(p_id, None)
+    if key:
+        _ranking.remove(key)
+
+
+def pages() -> int:
+    return max(1, -(-len(_ranking) // PAGE_SIZE))
+
+
+def total() -> int:
+    return len(_ranking)
+
+
+def top(n: int, offset: int = 0) -> list[tuple[int, int, float]]:
+    """n highest rated players from offset, as (rank, player_id, elo), ranks starting at 1"""
+    return [(offset + i + 1, p_id, -neg_elo)
+            for i, (neg_elo, p_id) in enumerate(_ranking.islice(offset, offset + n))]
+
+
+def rank_of(p_id: int) -> int | None:
+    """Rank of a player starting at 1, None if unrated"""
+    key = _keys.get(p_id)
+    if key is None:
+        return None
+    return _ranking.index(key) + 1
+
+
+def percentile(p_id: int) -> float | None:
+    """Percentage of rated players ranked below the player"""
+    rank = rank_of(p_id)
+    if rank is None:
+        return None
+    if len(_ranking) == 1:
+        return 100.0
+    return (len(_ranking) - rank) / (len(_ranking) - 1) * 100
@@ -2,7 +2,8 @@
 from discord import ExtensionAlreadyLoaded, ExtensionNotLoaded
 
 main_cogs = ["cogs.admin"]
-standard_cogs = ['cogs.contentplug', 'cogs.duel_lobby', 'cogs.matches', 'cogs.register', 'cogs.direct_messages']
+standard_cogs = ['cogs.contentplug', 'cogs.duel_lobby', 'cogs.matches', 'cogs.register', 'cogs.direct_messages',
+                 'cogs.leaderboard']
 __is_global_locked = True
 
 
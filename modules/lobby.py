@@ -14,6 +14,7 @@ from classes.players import Player
 from classes.match import BaseMatch
 from display import AllStrings as disp, embeds, views
 import modules.tools as tools
+import modules.matchmaking as matchmaking
 
 log = getLogger('fs_bot')
 
@@ -21,7 +22,10 @@ log = getLogger('fs_bot')
 
 # lists for lobby usage
 _lobbied_players: list[Player] = []
-_invites: dict[Player, list[Player]] = dict()  # list of invites by owner.id: list[invited players]
+_invites: dict[int, dict[Player, int]] = dict()  # invites by owner.id: {invited player: invite expiry stamp}
+
+# Invites
+INVITE_TIMEOUT: int = 300  # seconds, also used as the InviteView timeout
 
 # Logs
 logs: list[(int, str)] = []  # lobby logs recorded as a list of tuples, (timestamp, message)
@@ -59,6 +63,7 @@ def lobby_timeout(player):
     if player in _lobbied_players:
         player.on_lobby_leave()
         _lobbied_players.remove(player)
+        matchmaking.remove(player)
         warned_players.remove(player)
         lobby_log(f'{player.name} was removed from the lobby by timeout.')
         return True
@@ -81,6 +86,7 @@ def lobby_leave(player, match=None):
     if player in _lobbied_players:
         player.on_lobby_leave()
         _lobbied_players.remove(player)
+        matchmaking.remove(player)
         if match:
             lobby_log(f'{player.name} joined Match: {match.id_str}')
         else:
@@ -95,6 +101,7 @@ def lobby_join(player):
     if player not in _lobbied_players:
         player.on_lobby_add()
         _lobbied_players.append(player)
+        matchmaking.add(player)
         lobby_log(f'{player.name} joined the lobby.')
         return True
     else:
@@ -103,18 +110,16 @@ def lobby_join(player):
 
 def invite(owner: Player, invited: Player):
     """Invite Player to match, if match already existed returns match.  If player in match but not owner, returns false"""
+    expiry = tools.timestamp_now() + INVITE_TIMEOUT
     if owner.match:
         if owner.match.owner == owner:
-            owner.match.invite(invited)
+            owner.match.invite(invited, expiry)
             return owner.match
         else:
             return False
 
     else:
-        try:
-            _invites[owner.id].append(invited)
-        except KeyError:
-            _invites[owner.id] = [invited]
+        _invites.setdefault(owner.id, dict())[invited] = expiry
 
 
 async def accept_invite(owner, player):
@@ -133,11 +138,10 @@ async def accept_invite(owner, player):
         match = await BaseMatch.create(owner, player)
 
         await disp.MATCH_JOIN.send_temp(match.text_channel, f'{owner.mention}{player.mention}')
-        if owner.id in _invites:
-            _invites[owner.id].remove(player)
-            for player in _invites[owner.id]:
-                match.invite(player)
-                del _invites[owner.id]
+        pending = _invites.pop(owner.id, dict())
+        pending.pop(player, None)
+        for invited, expiry in pending.items():  # carry remaining invites over to the new match
+            match.invite(invited, expiry)
         lobby_leave(player, match)
         lobby_leave(owner, match)
         return match
@@ -146,16 +150,29 @@ def decline_invite(owner, player):
     if owner.match and owner.match.owner == owner:
         owner.match.decline_invite(player)
     if owner.id in _invites:
-        _invites[owner.id].remove(player)
+        _invites[owner.id].pop(player, None)
         if not _invites[owner.id]:
             del _invites[owner.id]
 
 
 def already_invited(owner, invited_players):
     already_invited_list = []
-    for match in BaseMatch._active_matches.values():
-        if match.owner.id == owner.id:
-            already_invited_list.extend([p for p in invited_players if p in match.invited])  # check matches for already invited players
-    if owner.id in _invites:
-        already_invited_list.extend([p for p in invited_players if p in _invites[owner.id]])  # check invites for already invited players
+    match = BaseMatch.active_match_by_owner(owner.id)
+    if match:  # check owners match for already invited players
+        already_invited_list.extend([p for p in invited_players if p in match.invited])
+    if owner.id in _invites:  # check invites for already invited players
+        already_invited_list.extend([p for p in invited_players if p in _invites[owner.id]])
     return already_invited_list
+
+
+def clear_expired_invites():
+    """Remove invites past their expiry, in case their InviteView timeout was missed"""
+    now = tools.timestamp_now()
+    for owner_id in list(_invites):
+        owner_invites = _invites[owner_id]
+        for player in [p for p, expiry in owner_invites.items() if expiry < now]:
+            del owner_invites[player]
+        if not owner_invites:
+            del _invites[owner_id]
+    for match in BaseMatch.active_matches_list():
+        match.clear_expired_invites(now)
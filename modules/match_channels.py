@@ -0,0 +1,179 @@
+"""Match channel lifecycle.
+A warm pool of hidden match channels is kept in the user category, so a new match is handed a channel with a
+single edit (name, topic and overwrites) instead of waiting on channel creation.  Ended match channels are recycled
+into the pool, purged and hidden again, rather than deleted.  The pool is kept at cfg.match_channel_pool_size by a
+background maintenance task, and reconciled with the channels already in the category at startup.
+
+Channels are only renamed when handed to a match, as Discord limits a channel to RENAME_LIMIT renames per
+RENAME_WINDOW.  A pooled channel out of renames is passed over, and a new channel created if none are left, so busy
+periods rotate through more channels rather than waiting out the rate limit."""
+
+# External Imports
+import asyncio
+import time
+from collections import deque
+import discord
+from logging import getLogger
+
+# Internal Imports
+import modules.config as cfg
+import modules.discord_obj as d_obj
+
+log = getLogger('fs_bot')
+
+POOL_NAME = 'casual┊pool┊'
+MATCH_CHANNEL_PREFIXES = ('casual', 'ranked')
+LATENCY_SAMPLES = 500
+RENAME_LIMIT = 2  # renames per channel per RENAME_WINDOW allowed by Discord
+RENAME_WINDOW = 600  # seconds
+
+_pool: list[discord.TextChannel] = list()
+_refilling: asyncio.Task | None = None
+_renames: dict[int, deque[float]] = dict()  # channel_id: monotonic stamps of recent renames
+
+# Seconds taken to hand a channel to a new match, (latency, taken from pool)
+acquire_latencies: deque[tuple[float, bool]] = deque(maxlen=LATENCY_SAMPLES)
+
+
+def base_overwrites() -> dict:
+    """Overwrites of a hidden match channel, visible to staff and the bot only"""
+    return {
+        d_obj.guild.default_role: discord.PermissionOverwrite(view_channel=False),
+        d_obj.roles['app_admin']: discord.PermissionOverwrite(view_channel=True),
+        d_obj.roles['admin']: discord.PermissionOverwrite(view_channel=True),
+        d_obj.roles['mod']: discord.PermissionOverwrite(view_channel=True),
+        d_obj.roles['bot']: discord.PermissionOverwrite(view_channel=True, manage_channels=True,
+                                                        manage_permissions=True)
+    }
+
+
+def pooled() -> int:
+    return len(_pool)
+
+
+def latency_percentiles() -> dict[str, float]:
+    """Channel hand out latency percentiles in seconds, and the share of channels taken from the pool"""
+    if not acquire_latencies:
+        return {}
+    samples = sorted(s[0] for s in acquire_latencies)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+    return {'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': samples[-1],
+            'pool_hit': sum(1 for s in acquire_latencies if s[1]) / len(acquire_latencies)}
+
+
+async def _create_pooled():
+    channel = await d_obj.categories['user'].create_text_channel(name=POOL_NAME, overwrites=base_overwrites(),
+                                                                  topic='Unused match channel')
+    _pool.append(channel)
+
+
+async def maintain():
+    """Create or delete channels until the pool is at its configured size"""
+    missing = cfg.match_channel_pool_size - len(_pool)
+    if missing > 0:
+        results = await asyncio.gather(*[_create_pooled() for _ in range(missing)], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                log.warning(f'Could not create pooled match channel: {result}')
+    elif missing < 0:
+        excess = [_pool.pop() for _ in range(-missing)]
+        await asyncio.gather(*[_delete(c, 'Match channel pool shrunk') for c in excess], return_exceptions=True)
+
+
+def _can_rename(channel: discord.TextChannel) -> bool:
+    stamps = _renames.get(channel.id)
+    if not stamps:
+        return True
+    while stamps and stamps[0] < time.monotonic() - RENAME_WINDOW:
+        stamps.popleft()
+    return len(stamps) < RENAME_LIMIT
+
+
+def _record_rename(channel: discord.TextChannel):
+    _renames.setdefault(channel.id, deque(maxlen=RENAME_LIMIT)).append(time.monotonic())
+
+
+async def _delete(channel: discord.TextChannel, reason: str):
+    _renames.pop(channel.id, None)
+    try:
+        await channel.delete(reason=reason)
+    except discord.NotFound:
+        pass
+
+
+def _refill_soon():
+    global _refilling
+    if _refilling is None or _refilling.done():
+        _refilling = asyncio.create_task(maintain())
+
+
+async def reconcile(exclude: set[int] = frozenset()):
+    """Adopt the match channels left in the user category into the pool, recycling any left in use.
+    Channel ids in exclude belong to restored matches and are left alone"""
+    _pool.clear()
+    channels = [c for c in d_obj.categories['user'].text_channels
+                if c.name.startswith(MATCH_CHANNEL_PREFIXES) and c.id not in exclude]
+    # recycle only as many as the pool holds, the rest are deleted without purging them first
+    keep = channels[:cfg.match_channel_pool_size]
+    results = await asyncio.gather(*[release(c) for c in keep],
+                                   *[_delete(c, 'Unused match channel') for c in channels[len(keep):]],
+                                   return_exceptions=True)
+    for channel, result in zip(channels, results):
+        if isinstance(result, Exception):
+            log.warning(f'Could not release match channel {channel.name}: {result}')
+    log.info(f'Match channel pool reconciled, adopted {len(_pool)} of {len(channels)} existing channels')
+    await maintain()
+
+
+async def acquire(name: str, topic: str, members: list[discord.Member]) -> discord.TextChannel:
+    """A match channel named name, visible to members.  Taken from the pool if possible, else created"""
+    start = time.perf_counter()
+    overwrites = base_overwrites()
+    overwrites.update({m: discord.PermissionOverwrite(view_channel=True) for m in members if m})
+    while True:
+        channel = next((c for c in reversed(_pool) if _can_rename(c)), None)
+        if channel is None:
+            break
+        _pool.remove(channel)
+        try:
+            await channel.edit(name=name, topic=topic, overwrites=overwrites)
+        except discord.NotFound:  # pooled channel deleted manually
+            continue
+        _record_rename(channel)
+        _refill_soon()
+        acquire_latencies.append((time.perf_counter() - start, True))
+        return channel
+    _refill_soon()
+    channel = await d_obj.categories['user'].create_text_channel(name=name, overwrites=overwrites, topic=topic)
+    acquire_latencies.append((time.perf_counter() - start, False))
+    return channel
+
+
+async def recycle(channel: discord.TextChannel):
+    """Purge a match channel and hide it again, returning it to the pool"""
+    await channel.purge(limit=None)
+    if any(isinstance(target, discord.Member) for target in channel.overwrites):
+        await channel.edit(overwrites=base_overwrites())
+    _pool.append(channel)
+
+
+async def release(channel: discord.TextChannel):
+    """Recycle an ended match channel, or delete it if the pool is already full or it could not be recycled.
+    A full pool swaps a channel out of renames for this one, if this one can still be renamed"""
+    if len(_pool) >= cfg.match_channel_pool_size and _can_rename(channel):
+        stale = next((c for c in _pool if not _can_rename(c)), None)
+        if stale:
+            _pool.remove(stale)
+            await _delete(stale, 'Match channel out of renames')
+    if len(_pool) < cfg.match_channel_pool_size:
+        try:
+            await recycle(channel)
+            return
+        except discord.NotFound:
+            return
+        except discord.HTTPException as e:
+            log.warning(f'Could not recycle match channel {channel.name}, deleting it: {e}')
+    await _delete(channel, 'Match Ended')
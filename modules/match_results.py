@@ -0,0 +1,57 @@
+"""Ranked match results pipeline.
+Ended ranked matches are queued here and processed by a single background worker, which applies the result to
+the ratings table and persists changed stats, so a match's teardown never waits on Elo calculation or the
+database.  Results are processed one at a time in the order matches ended."""
+
+# External Imports
+import asyncio
+from logging import getLogger
+
+# Internal Imports
+import modules.stats_handler as stats_handler
+
+log = getLogger('fs_bot')
+
+_queue: asyncio.Queue | None = None
+_worker: asyncio.Task | None = None
+
+
+def submit(match_id: int, player1: 'classes.ActivePlayer', player2: 'classes.ActivePlayer', match_length: int):
+    """Queue a ranked result, players hold their round wins / losses for the match"""
+    _ensure_worker()
+    _queue.put_nowait((match_id, player1, player2, match_length))
+
+
+def pending() -> int:
+    return _queue.qsize() if _queue else 0
+
+
+async def drain():
+    """Wait until every queued result has been processed"""
+    if _queue:
+        await _queue.join()
+
+
+def _ensure_worker():
+    global _queue, _worker
+    if _worker is None or _worker.done():
+        if _queue is None:
+            _queue = asyncio.Queue()
+        _worker = asyncio.create_task(_run())
+
+
+async def _run():
+    while True:
+        match_id, player1, player2, match_length = await _queue.get()
+        try:
+            _, _, winner = stats_handler.update_elo(player1, player2, match_id, match_length)
+            log.info(f'Match ID [{match_id}]: ranked result {player1.name} {player1.round_wins} - '
+                     f'{player2.round_wins} {player2.name}, winner: {winner.name if winner else "draw"}')
+            if _queue.empty():  # persist once the backlog is processed, rather than per result
+                await stats_handler.flush_stats()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception(f'Error processing ranked result for Match ID [{match_id}]', exc_info=e)
+        finally:
+            _queue.task_done()
@@ -0,0 +1,63 @@
+"""Durable state of active matches.
+Matches mark themselves dirty as their state changes, and dirty matches are written to the 'matches' collection in a
+single bulk write per flush, so a match changing many times between flushes costs one write.  Live match documents
+have no end_stamp, and are restored on startup.  Only the tail of the match log is kept in the live state, the full
+log is written once the match ends, replacing the live document."""
+
+# External Imports
+import asyncio
+from logging import getLogger
+
+# Internal Imports
+import modules.database as db
+
+log = getLogger('fs_bot')
+
+LOG_TAIL = 50  # match log entries kept in the live state
+
+_dirty: dict[int, 'BaseMatch'] = dict()  # match_id: match with unwritten state
+# Held while live state is written, end_match holds it for its final write so a live write can't land after it
+write_lock = asyncio.Lock()
+
+
+def mark(match):
+    """Queue a match's state to be written on the next flush, ended matches are written by end_match instead"""
+    if not match.end_stamp:
+        _dirty[match.id] = match
+
+
+def discard(match):
+    _dirty.pop(match.id, None)
+
+
+def pending() -> int:
+    return len(_dirty)
+
+
+def take_dirty() -> list[tuple[int, dict]]:
+    """Pop the dirty matches, as (match_id, update document)"""
+    updates = [(m_id, {'$set': match.get_state()}) for m_id, match in _dirty.items() if not match.end_stamp]
+    _dirty.clear()
+    return updates
+
+
+async def flush():
+    """Write every dirty match in one bulk write, matches are re-queued if the write fails"""
+    async with write_lock:
+        taken = list(_dirty.values())
+        updates = take_dirty()
+        if not updates:
+            return
+        try:
+            await db.async_db_call(db.bulk_update_elements, 'matches', updates)
+        except Exception as e:
+            for match in taken:
+                mark(match)
+            log.exception('Error writing active match state, will retry', exc_info=e)
+        else:
+            log.debug(f'Wrote state of {len(updates)} active matches')
+
+
+def load_live() -> list[dict]:
+    """Live match documents, of matches that hadn't ended when the bot stopped"""
+    return db.find_elements('matches', {'end_stamp': None}, sort=[('_id', 1)])
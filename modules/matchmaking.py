@@ -0,0 +1,122 @@
+"""Matchmaking index for the lobby.
+Lobbied players are bucketed by (skill level, accepted skill levels, preferred factions), so compatible opponents
+are found by checking buckets rather than every lobbied player."""
+
+# External Imports
+from functools import lru_cache
+from logging import getLogger
+
+# Internal Imports
+import modules.config as cfg
+from classes.players import Player, SkillLevel
+
+log = getLogger('fs_bot')
+
+ALL_LEVELS = frozenset(SkillLevel)
+ALL_FACTIONS = frozenset(cfg.factions.values())
+
+# Buckets of lobbied players by bucket key, dicts are used as insertion ordered sets
+_buckets: dict[tuple, dict[Player, None]] = dict()
+_player_keys: dict[Player, tuple] = dict()  # player: bucket key the player is currently indexed under
+
+
+def _key(player: Player) -> tuple:
+    """Bucket key for a player, (skill_level, accepted skill levels, preferred factions)"""
+    accepted = frozenset(player.req_skill_levels) if player.req_skill_levels else ALL_LEVELS
+    factions = frozenset(player.pref_factions) if player.pref_factions else ALL_FACTIONS
+    return player.skill_level, accepted, factions
+
+
+@lru_cache(maxsize=None)
+def _keys_compatible(key1: tuple, key2: tuple) -> bool:
+    """Both players accept the others skill level"""
+    return key2[0] in key1[1] and key1[0] in key2[1]
+
+
+@lru_cache(maxsize=None)
+def _keys_weight(key1: tuple, key2: tuple) -> int:
+    """Pairing weight between two buckets, favours close skill levels, then shared faction preferences"""
+    closeness = len(SkillLevel) - 1 - abs(key1[0].rank - key2[0].rank)
+    shared_faction = 1 if key1[2] & key2[2] else 0
+    return 2 * closeness + shared_faction
+
+
+def add(player: Player):
+    """Index a lobbied player"""
+    if player in _player_keys:
+        return
+    key = _key(player)
+    _player_keys[player] = key
+    try:
+        _buckets[key][player] = None
+    except KeyError:
+        _buckets[key] = {player: None}
+
+
+def remove(player: Player):
+    """Remove a player from the index, returns True if the player was indexed"""
+    key = _player_keys.pop(player, None)
+    if key is None:
+        return False
+    bucket = _buckets[key]
+    del bucket[player]
+    if not bucket:
+        del _buckets[key]
+    return True
+
+
+def update(player: Player):
+    """Re-index a player after their preferences have changed, only if they were indexed"""
+    key = _player_keys.get(player)
+    if key is None or key == _key(player):
+        return
+    remove(player)
+    add(player)
+
+
+def clear():
+    _buckets.clear()
+    _player_keys.clear()
+
+
+def compatible(player: Player) -> list[Player]:
+    """Lobbied players whose skill requirements are mutually satisfied with player's,
+    opponents sharing a preferred faction are listed first"""
+    key = _player_keys.get(player) or _key(player)
+    shared, other = [], []
+    for bucket_key, bucket in _buckets.items():
+        if not _keys_compatible(key, bucket_key):
+            continue
+        target = shared if key[2] & bucket_key[2] else other
+        target.extend(p for p in bucket if p is not player)
+    return shared + other
+
+
+def propose_pairings() -> list[tuple[Player, Player]]:
+    """Propose pairings for the current lobby.
+    Greedy approximation of a max-weight matching, done per bucket pair so cost scales with the
+    number of buckets rather than the number of player pairs.  Longest waiting players are paired first
+    within each bucket."""
+    keys = list(_buckets)
+    edges = []
+    for i, key1 in enumerate(keys):
+        for key2 in keys[i:]:
+            if _keys_compatible(key1, key2):
+                edges.append((_keys_weight(key1, key2), key1, key2))
+    edges.sort(key=lambda edge: edge[0], reverse=True)
+
+    queues = {key: sorted(_buckets[key], key=lambda p: p.first_lobbied_timestamp) for key in keys}
+    heads = dict.fromkeys(keys, 0)  # index of the next unpaired player in each queue
+    pairings = []
+    for _, key1, key2 in edges:
+        q1, q2 = queues[key1], queues[key2]
+        if key1 == key2:
+            while len(q1) - heads[key1] >= 2:
+                pairings.append((q1[heads[key1]], q1[heads[key1] + 1]))
+                heads[key1] += 2
+        else:
+            while heads[key1] < len(q1) and heads[key2] < len(q2):
+                pairings.append((q1[heads[key1]], q2[heads[key2]]))
+                heads[key1] += 1
+                heads[key2] += 1
+    return pairings
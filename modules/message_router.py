@@ -0,0 +1,57 @@
+"""Central on_message listener.
+Routes messages to handlers by channel id, or to DM handlers for direct messages, from a routing table updated as
+match channels and modmail threads open and close.  Messages in unrelated channels cost a single dict lookup."""
+
+# External Imports
+import discord
+from logging import getLogger
+from typing import Callable, Awaitable
+
+# Internal Imports
+from modules.loader import is_all_locked
+
+log = getLogger('fs_bot')
+
+Handler = Callable[[discord.Message], Awaitable]
+
+_bot: discord.Bot | None = None
+_channel_routes: dict[int, Handler] = dict()  # channel_id: handler
+_dm_handlers: list[Handler] = list()
+
+
+def init(client: discord.Bot):
+    global _bot
+    _bot = client
+    client.add_listener(route, 'on_message')
+
+
+def add_channel_route(channel_id: int, handler: Handler):
+    _channel_routes[channel_id] = handler
+
+
+def remove_channel_route(channel_id: int):
+    _channel_routes.pop(channel_id, None)
+
+
+def add_dm_handler(handler: Handler):
+    if handler not in _dm_handlers:
+        _dm_handlers.append(handler)
+
+
+def remove_dm_handler(handler: Handler):
+    if handler in _dm_handlers:
+        _dm_handlers.remove(handler)
+
+
+async def route(message: discord.Message):
+    if message.guild is None:
+        if not _dm_handlers or message.author == _bot.user or is_all_locked():
+            return
+        for handler in _dm_handlers:
+            await handler(message)
+        return
+
+    handler = _channel_routes.get(message.channel.id)
+    if handler is None or message.author == _bot.user or is_all_locked():
+        return
+    await handler(message)
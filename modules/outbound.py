@@ -0,0 +1,175 @@
+"""Outbound Discord request scheduler.
+Requests are queued per route (a channel, or a user's DM's), each route paced by a token bucket sized to Discord's
+per channel limits.  The highest priority request across all ready routes is sent first, so low value edits
+(dashboard refreshes) wait behind high value ones (account DM's).  Queued edits of the same message are coalesced,
+the last write wins and every caller receives its result."""
+
+# External Imports
+import asyncio
+import itertools
+import time
+from collections import deque
+from enum import IntEnum
+from logging import getLogger
+from typing import Callable, Awaitable, Hashable
+
+# Internal Imports
+import modules.tools as tools
+
+log = getLogger('fs_bot')
+
+
+class Priority(IntEnum):
+    HIGH = 0  # account details, match creation
+    NORMAL = 1
+    LOW = 2  # dashboard and embed refreshes
+
+
+ROUTE_CAPACITY = 5  # requests per route per window
+ROUTE_WINDOW = 5  # seconds
+MAX_IN_FLIGHT = 10  # concurrent requests across all routes
+LATENCY_SAMPLES = 1000
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'factory', 'future', 'coalesce_key', 'queued_at')
+
+    def __init__(self, priority, seq, factory, future, coalesce_key):
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.future = future
+        self.coalesce_key = coalesce_key
+        self.queued_at = time.monotonic()
+
+
+class _Route:
+    __slots__ = ('tokens', 'last', 'jobs')
+
+    def __init__(self):
+        self.tokens = ROUTE_CAPACITY
+        self.last = time.monotonic()
+        self.jobs: list[_Job] = []
+
+    def refill(self, now):
+        self.tokens = min(ROUTE_CAPACITY, self.tokens + (now - self.last) * ROUTE_CAPACITY / ROUTE_WINDOW)
+        self.last = now
+
+    def next_token_in(self) -> float:
+        return max(0.0, (1 - self.tokens) * ROUTE_WINDOW / ROUTE_CAPACITY)
+
+
+_routes: dict[Hashable, _Route] = dict()
+_coalescing: dict[Hashable, _Job] = dict()  # queued jobs by coalesce key
+_seq = itertools.count()
+_wakeup: asyncio.Event | None = None
+_worker: asyncio.Task | None = None
+_in_flight: asyncio.Semaphore | None = None
+
+# Queue latency by priority, seconds between submit and dispatch
+latencies: dict[Priority, deque[float]] = {p: deque(maxlen=LATENCY_SAMPLES) for p in Priority}
+
+
+async def submit(route: Hashable, factory: Callable[[], Awaitable], priority: Priority = Priority.NORMAL,
+                 coalesce_key: Hashable = None):
+    """Queue factory() to be called on route, returns its result once sent.
+    If a job with the same coalesce_key is still queued, its factory is replaced instead."""
+    _ensure_worker()
+    if coalesce_key is not None and coalesce_key in _coalescing:
+        job = _coalescing[coalesce_key]
+        job.factory = factory
+        return await asyncio.shield(job.future)
+
+    job = _Job(priority, next(_seq), factory, asyncio.get_running_loop().create_future(), coalesce_key)
+    if coalesce_key is not None:
+        _coalescing[coalesce_key] = job
+    try:
+        route_obj = _routes[route]
+    except KeyError:
+        route_obj = _routes[route] = _Route()
+    route_obj.jobs.append(job)
+    _wakeup.set()
+    return await asyncio.shield(job.future)
+
+
+def latency_stats() -> dict[str, tuple[int, float, float]]:
+    """Queue latency per priority, as (samples, average, max)"""
+    stats = dict()
+    for priority, samples in latencies.items():
+        if samples:
+            stats[priority.name] = (len(samples), sum(samples) / len(samples), max(samples))
+        else:
+            stats[priority.name] = (0, 0.0, 0.0)
+    return stats
+
+
+def queued() -> int:
+    return sum(len(r.jobs) for r in _routes.values())
+
+
+def _ensure_worker():
+    global _wakeup, _worker, _in_flight
+    if _worker is None or _worker.done():
+        _wakeup = asyncio.Event()
+        _in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        _worker = asyncio.create_task(_run())
+
+
+def _pick(now) -> tuple[_Route | None, _Job | None, float | None]:
+    """Highest priority, oldest job across routes with a token available.
+    Also returns the wait until the next route gets a token, if none are ready."""
+    best_route, best_job, wait = None, None, None
+    for key in list(_routes):
+        route = _routes[key]
+        if not route.jobs:
+            route.refill(now)
+            if route.tokens >= ROUTE_CAPACITY:  # idle and full, forget the route
+                del _routes[key]
+            continue
+        route.refill(now)
+        if route.tokens < 1:
+            token_in = route.next_token_in()
+            wait = token_in if wait is None else min(wait, token_in)
+            continue
+        job = min(route.jobs, key=lambda j: (j.priority, j.seq))
+        if best_job is None or (job.priority, job.seq) < (best_job.priority, best_job.seq):
+            best_route, best_job = route, job
+    return best_route, best_job, wait
+
+
+async def _send(job: _Job):
+    try:
+        result = await job.factory()
+    except Exception as e:
+        if not job.future.done():
+            job.future.set_exception(e)
+    else:
+        if not job.future.done():
+            job.future.set_result(result)
+    finally:
+        _in_flight.release()
+
+
+async def _run():
+    while True:
+        try:
+            now = time.monotonic()
+            route, job, wait = _pick(now)
+            if job is None:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await _in_flight.acquire()
+            route.jobs.remove(job)
+            route.tokens -= 1
+            if job.coalesce_key is not None:
+                _coalescing.pop(job.coalesce_key, None)
+            latencies[job.priority].append(time.monotonic() - job.queued_at)
+            tools.background(_send(job), 'sending outbound request')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception('Error in outbound scheduler', exc_info=e)
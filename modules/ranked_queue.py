@@ -0,0 +1,142 @@
+"""Ranked queue, pairs queued players by Elo proximity.
+The window of accepted rating gaps widens the longer a player has been waiting,
+the queue is processed in batched ticks rather than per join."""
+
+# External Imports
+import bisect
+from collections import deque
+from logging import getLogger
+
+# Internal Imports
+from classes.players import Player
+from classes.player_stats import PlayerStats
+import modules.tools as tools
+
+log = getLogger('fs_bot')
+
+BASE_WINDOW = 50  # accepted Elo gap on joining the queue
+WINDOW_GROWTH = 2  # Elo added to the window per second waited
+MAX_WINDOW = 400
+
+_queue: list[tuple[float, int]] = []  # queued players sorted by (elo, player_id)
+_queued: dict[int, tuple[float, int]] = dict()  # player_id: (elo, join stamp)
+_last_paired: dict[int, int] = dict()  # player_id: join stamp, of players paired by the last tick
+
+# Stats for pairings made, (wait time, rating gap)
+pairing_stats: deque[tuple[int, float]] = deque(maxlen=1000)
+
+
+def get_rating(player: Player) -> float:
+    return PlayerStats.get(player.id, player.name).elo
+
+
+def set_rating(p_id: int, elo: float):
+    """Re-sort a player on a rating change, if they are queued"""
+    if p_id in _queued:
+        old_elo, stamp = _queued[p_id]
+        _remove_sorted(old_elo, p_id)
+        bisect.insort(_queue, (elo, p_id))
+        _queued[p_id] = (elo, stamp)
+
+
+def _remove_sorted(elo, p_id):
+    i = bisect.bisect_left(_queue, (elo, p_id))
+    if i < len(_queue) and _queue[i] == (elo, p_id):
+        del _queue[i]
+
+
+def window(waited: int) -> float:
+    return min(BASE_WINDOW + WINDOW_GROWTH * waited, MAX_WINDOW)
+
+
+def stats() -> tuple[float, float]:
+    """Average wait time and rating gap of recent pairings"""
+    if not pairing_stats:
+        return 0, 0
+    return (sum(s[0] for s in pairing_stats) / len(pairing_stats),
+            sum(s[1] for s in pairing_stats) / len(pairing_stats))
+
+
+def queued() -> list[Player]:
+    return [Player.get(p_id) for p_id in _queued]
+
+
+def is_queued(player: Player) -> bool:
+    return player.id in _queued
+
+
+async def join(player: Player) -> bool:
+    """Adds player to the ranked queue, returns True if added"""
+    if player.id in _queued:
+        return False
+    elo = get_rating(player)
+    _queued[player.id] = (elo, tools.timestamp_now())
+    bisect.insort(_queue, (elo, player.id))
+    return True
+
+
+def requeue(player: Player) -> bool:
+    """Puts a player paired by the last tick back in the queue with their original join stamp, keeping their
+    widened window.  Returns True if requeued"""
+    stamp = _last_paired.pop(player.id, None)
+    if stamp is None or player.id in _queued:
+        return False
+    elo = get_rating(player)
+    _queued[player.id] = (elo, stamp)
+    bisect.insort(_queue, (elo, player.id))
+    return True
+
+
+def leave(player: Player) -> bool:
+    """Removes player from the ranked queue, returns True if removed"""
+    if player.id not in _queued:
+        return False
+    elo, _ = _queued.pop(player.id)
+    _remove_sorted(elo, player.id)
+    return True
+
+
+def tick(now: int = None) -> list[tuple[Player, Player]]:
+    """Pairs queued players, longest waiting first, with the closest rated player whose gap falls within
+    both players windows.  Paired players are removed from the queue."""
+    now = now or tools.timestamp_now()
+    paired = set()
+    pairs = []
+    for p_id, (elo, stamp) in sorted(_queued.items(), key=lambda item: item[1][1]):
+        if p_id in paired:
+            continue
+        p_window = window(now - stamp)
+        i = bisect.bisect_left(_queue, (elo, p_id))
+        best = None
+        lo, hi = i - 1, i + 1
+        # walk outwards from the player, skipping players already paired this tick
+        while lo >= 0 or hi < len(_queue):
+            lo_gap = elo - _queue[lo][0] if lo >= 0 else None
+            hi_gap = _queue[hi][0] - elo if hi < len(_queue) else None
+            if hi_gap is None or (lo_gap is not None and lo_gap <= hi_gap):
+                gap, o_id = lo_gap, _queue[lo][1]
+                lo -= 1
+            else:
+                gap, o_id = hi_gap, _queue[hi][1]
+                hi += 1
+            if gap > p_window:
+                break
+            if o_id in paired:
+                continue
+            if gap <= window(now - _queued[o_id][1]):
+                best = (o_id, gap)
+                break
+        if best:
+            o_id, gap = best
+            paired.update((p_id, o_id))
+            pairs.append((Player.get(p_id), Player.get(o_id)))
+            pairing_stats.append((now - stamp, gap))
+
+    _last_paired.clear()
+    for p_id in paired:
+        elo, _last_paired[p_id] = _queued.pop(p_id)
+        _remove_sorted(elo, p_id)
+    if pairs:
+        log.info(f'Ranked queue paired {len(pairs)} match{"es" if len(pairs) > 1 else ""}, '
+                 f'{len(_queued)} still queued')
+    return pairs
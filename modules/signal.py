@@ -7,6 +7,9 @@ from logging import getLogger
 
 # Internal Imports
 import modules.database as db
+import modules.stats_handler as stats_handler
+import modules.match_state as match_state
+from classes.player_stats import PlayerStats
 import cogs.direct_messages
 import discord
 
@@ -17,6 +20,14 @@ def save_state(loop):
     log.info('SIGINT caught, saving state...')
     dm_dict = cogs.direct_messages.dm_threads_to_str()
     db.set_field('restart_data', 0, {'dm_threads': dm_dict})
+    try:  # rating changes not yet flushed by stats_flush_loop
+        stats_handler.write_stats(*PlayerStats.take_dirty())
+    except Exception as e:
+        log.exception('Error writing player stats on shutdown', exc_info=e)
+    try:  # active match state not yet flushed by match_state_loop
+        db.bulk_update_elements('matches', match_state.take_dirty())
+    except Exception as e:
+        log.exception('Error writing active match state on shutdown', exc_info=e)
     log.info('Stopping...')
     loop.stop()
     sys.exit(0)
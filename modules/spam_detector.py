@@ -1,43 +1,71 @@
-"""Simple method to detect spam.  Aggregates calls from a user ID,
- blocks if more than __msg_frequency within last __msg_distance seconds"""
+"""Simple method to detect spam.  Token bucket per user ID and command class,
+ each bucket holds up to capacity requests and refills over window seconds.
+ Buckets of users inactive for longer than IDLE_TIMEOUT are evicted, oldest first."""
 
 # External Imports
-import discord
+from collections import OrderedDict
 from logging import getLogger
+import time
 
 # Internal Imports
 from display import AllStrings as disp
-from modules.tools import timestamp_now
 
 log = getLogger('fs_bot')
 
-__spam_list = dict()
-__last_requests = dict()
-_msg_frequency = 5
-_msg_distance = 20
+# Limits by command class, (capacity, window in seconds)
+LIMITS = {
+    'command': (5, 20),
+    'button': (5, 20)
+}
+IDLE_TIMEOUT = 300  # seconds of inactivity before a users bucket is evicted
+MAX_BUCKETS = 100000  # hard cap on tracked buckets, least recently used evicted first
+
+# (user_id, command class): [tokens, last request], ordered least to most recently used
+__buckets: OrderedDict[tuple[int, str], list[float]] = OrderedDict()
+
+
+def _evict(now):
+    """Drop buckets that are idle, or over the cap.  Buckets are ordered by last use, so only the front is checked"""
+    while __buckets:
+        key, (_, last) = next(iter(__buckets.items()))
+        if last > now - IDLE_TIMEOUT and len(__buckets) <= MAX_BUCKETS:
+            break
+        del __buckets[key]
+
+
+def check(a_id, command_class='command', now=None) -> bool:
+    """Takes a token from the users bucket, returns True if the user is over their limit"""
+    now = now or time.monotonic()
+    capacity, window = LIMITS[command_class]
+    key = (a_id, command_class)
+    bucket = __buckets.get(key)
+    if bucket:
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / window)
+        bucket[1] = now
+        __buckets.move_to_end(key)
+    else:
+        bucket = __buckets[key] = [capacity, now]
+        _evict(now)
+    if bucket[0] < 1:
+        return True
+    bucket[0] -= 1
+    return False
 
 
 async def is_spam(ctx, view=False):
     user = ctx.user
-    a_id = user.id
-    if a_id in __spam_list and __spam_list[a_id] > 0:
-        if a_id in __last_requests and __last_requests[a_id] < timestamp_now() - _msg_distance:
-            if not view:
-                log.debug(f'Automatically Unlocked User ID:{a_id}, User Name: {user.name} from spam filter')
-            unlock(a_id)
-            return False
-    __last_requests[a_id] = timestamp_now()
-    if a_id not in __spam_list:
-        __spam_list[a_id] = 1
-        return False
-    __spam_list[a_id] += 1
-    if __spam_list[a_id] == 1:
-        return False
-    if __spam_list[a_id] > _msg_frequency:
+    if check(user.id, 'button' if view else 'command'):
         await disp.STOP_SPAM.send_priv(ctx, user.mention)
         return True
     return False
 
 
 def unlock(a_id):
-    __spam_list[a_id] = 0
+    """Refund the token taken by a completed command, only commands still running count towards the limit"""
+    bucket = __buckets.get((a_id, 'command'))
+    if bucket:
+        bucket[0] = min(LIMITS['command'][0], bucket[0] + 1)
+
+
+def tracked() -> int:
+    return len(__buckets)
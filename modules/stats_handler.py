@@ -1,16 +1,25 @@
 """Handles ELO calculation for the rest of the Bot"""
 
 # External Imports
+import asyncio
 from logging import getLogger
 import math
 
 # Internal Imports
 from classes.player_stats import PlayerStats
 import modules.database as db
+import modules.ranked_queue as ranked_queue
+import modules.elo_history as elo_history
+import modules.leaderboard as leaderboard
+
+log = getLogger('fs_bot')
 
 K_FACTOR = 40
 SCALE_FACTOR = 400
 
+# Held by flushes, as history writes of a player must land in order, and by recomputes, which replace the table
+flush_lock = asyncio.Lock()
+
 
 def _get_player_win_expectation(player_rating, opponent_rating):
     numerator = 1 + 10 ** ((opponent_rating - player_rating) / SCALE_FACTOR)
@@ -28,9 +37,11 @@ def _get_player_score(player, match_length):
     return player_score
 
 
-async def update_elo(player1: 'classes.ActivePlayer', player2: 'classes.ActivePlayer', match_id, match_length=7):
-    player1_stats = await PlayerStats.get_from_db(player1.id, player1.name)
-    player2_stats = await PlayerStats.get_from_db(player2.id, player2.name)
+def update_elo(player1: 'classes.ActivePlayer', player2: 'classes.ActivePlayer', match_id, match_length=7):
+    """Apply a match result to the in memory ratings table.  Both ratings are computed before either is changed,
+    changes are persisted by flush_stats"""
+    player1_stats = PlayerStats.get(player1.id, player1.name)
+    player2_stats = PlayerStats.get(player2.id, player2.name)
 
     player1_win_xpt = _get_player_win_expectation(player1_stats.elo, player2_stats.elo)
     player2_win_xpt = _get_player_win_expectation(player2_stats.elo, player1_stats.elo)
@@ -55,7 +66,42 @@ async def update_elo(player1: 'classes.ActivePlayer', player2: 'classes.ActivePl
     #  update player_stats
     player1_stats.add_match(match_id, player1_new_elo, player1.match_win)
     player2_stats.add_match(match_id, player2_new_elo, player2.match_win)
-    await player1_stats.push_to_db()
-    await player2_stats.push_to_db()
+    ranked_queue.set_rating(player1.id, player1_new_elo)
+    ranked_queue.set_rating(player2.id, player2_new_elo)
+    leaderboard.update(player1.id, player1_new_elo)
+    leaderboard.update(player2.id, player2_new_elo)
 
     return player1_stats, player2_stats, match_winner
+
+
+def write_stats(data: list[dict], history: list[tuple[int, int, list]]) -> tuple[list[dict], list[tuple]]:
+    """History is written first, and stats of players whose history failed are held back, so a stored
+    history_count never counts entries that were not written.  Returns the data and history whose writes failed"""
+    failed_history = elo_history.write_history(history)
+    held = {p_id for p_id, _, _ in failed_history}
+    failed_data = [d for d in data if d['_id'] in held]
+    to_write = [d for d in data if d['_id'] not in held]
+    try:
+        db.bulk_set_elements('user_stats', to_write)
+    except db.BulkWriteError as e:
+        failed_data.extend(to_write[i] for i in db.failed_indexes(e, len(to_write)))
+    return failed_data, failed_history
+
+
+async def flush_stats():
+    """Persist every changed stats object and its new history entries, one bulk write per collection.
+    Failed writes are re-queued, history writes are idempotent so a full retry never duplicates entries"""
+    async with flush_lock:
+        data, history = PlayerStats.take_dirty()
+        if not data:
+            return
+        try:
+            failed_data, failed_history = await db.async_db_call(write_stats, data, history)
+        except Exception as e:
+            PlayerStats.mark_dirty(data, history)
+            log.exception('Error writing player stats, will retry', exc_info=e)
+            return
+        if failed_data or failed_history:
+            PlayerStats.mark_dirty(failed_data, failed_history)
+            log.warning(f'Failed writing {len(failed_data)} of {len(data)} player stats, will retry')
+        log.debug(f'Wrote {len(data) - len(failed_data)} player stats')
@@ -1,7 +1,8 @@
 """utility functions, some from pogbot"""
 
+import asyncio
 from datetime import datetime as dt
-from typing import Literal
+from typing import Literal, Coroutine
 
 import discord
 
@@ -30,6 +31,23 @@ class UnexpectedError(Exception):
         super().__init__(message)
 
 
+_background_tasks: set[asyncio.Task] = set()  # referenced until done, so they aren't garbage collected early
+
+
+def background(coro: Coroutine, description: str) -> asyncio.Task:
+    """Run coro as a background task, kept referenced until done, logging any error it raises"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception():
+            log.error(f'Error in background task, {description}', exc_info=t.exception())
+
+    task.add_done_callback(_done)
+    return task
+
+
 def timestamp_now():
     return int(dt.timestamp(dt.now()))
 